@@ -6,9 +6,8 @@ The origin of the new GeoTIFF files is derived from a KML file.
 import os, sys
 sys.path.append(os.path.abspath(".."))
 
-# import geo_utils - and this script also requires pyproj (install with pyshp)
+# import geo_utils
 from geo_utils.geo_utils import *
-import pyproj
 
 
 @cache
@@ -35,10 +34,9 @@ def project_tiffs(kml_dir, src_tiff_dir, epsg_tar, epsg_src=4326, tiff_prefix=""
     # read kml file as geopandas dataframe
     gdf_kml = kmx2other(kml_dir, output="gpd")
 
-    # define source and target coordinate systems
-    kml_crs = pyproj.CRS("EPSG:%s" % str(epsg_src))
-    tar_crs = pyproj.CRS("EPSG:%s" % str(epsg_tar))
-    transformer = pyproj.Transformer.from_crs(kml_crs, tar_crs)
+    # transform all kml origins (longitude, latitude) from the source to the target coordinate system at once
+    kml_coords = np.array([[float(coord) for coord in coords.split(",")[:2]] for coords in gdf_kml["coordinates"]])
+    origins_x, origins_y = transform_coords(kml_coords[:, 0], kml_coords[:, 1], epsg_src, epsg_tar)
 
     # retrieve prefix name of tiff files
     tiff_prefix_dir = "{0}{1}".format(src_tiff_dir, tiff_prefix)
@@ -49,17 +47,13 @@ def project_tiffs(kml_dir, src_tiff_dir, epsg_tar, epsg_src=4326, tiff_prefix=""
         print(" * identified raster name %s ..." % tiff_name)
 
         print("   - retrieving origin coordinates from kml")
-        long, lat, alt = (float(coord) for coord in gdf_kml["coordinates"][i].split(","))
-        x, y = transformer.transform(lat, long)
+        x, y = origins_x[i], origins_y[i]
 
         print("   - opening R, G, and B arrays of the source raster ... ")
-        src_ras, red_array, none_ref = raster2array(tiff_name, band_number=1)
-        src_ras, blue_array, none_ref = raster2array(tiff_name, band_number=2)
-        src_ras, green_array, none_ref = raster2array(tiff_name, band_number=3)
+        # read all three bands in one call into a (3, rows, cols) array
+        src_ras, rgb, none_ref = raster2array(tiff_name, band_number=[1, 2, 3])
         # release source raster
         src_ras = None
-        # summarize RGB array in  list
-        rgb = [red_array, blue_array, green_array]
 
         print("   - creating new projected raster ... ")
         create_raster(file_name=tar_tiff_dir + tiff_prefix + "%0004i" % img_no + "_georef.tif",
@@ -1,6 +1,6 @@
 import sys, os
 sys.path.append(r'' + os.path.abspath(''))
-__all__ = ['srs_mgmt', 'shp_mgmt', 'raster_mgmt', 'dataset_mgmt', 'geo_utils', 'kml', 'kmx_parser']
+__all__ = ['srs_mgmt', 'shp_mgmt', 'raster_mgmt', 'dataset_cache', 'dataset_mgmt', 'raster_algebra', 'gridding', 'geo_utils', 'kml', 'kmx_parser']
 
 from .geo_utils import *
 
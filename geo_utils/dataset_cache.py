@@ -0,0 +1,157 @@
+"""Process-wide cache of open ``gdal`` and ``ogr`` dataset handles, which avoids re-opening (and re-parsing the
+headers of) the same files over and over again in batch jobs."""
+from .geoconfig import *
+import threading
+from collections import OrderedDict
+
+
+class DatasetCache:
+    """Least-recently-used (LRU) cache of open raster (``gdal``) and vector (``ogr``) datasets.
+
+    Handles are keyed by the file path, its modification time and size, the access mode, and the calling thread,
+    because ``gdal`` dataset handles must not be shared between threads. Modified files are re-opened automatically,
+    and forked (child) processes start with an empty cache.
+
+    Args:
+        max_handles (int): Maximum number of simultaneously open handles (default: ``geoconfig.max_open_datasets``).
+
+    Attributes:
+        max_handles (int): Maximum number of simultaneously open handles. The least recently used handles are closed first.
+    """
+
+    def __init__(self, max_handles=max_open_datasets):
+        self.max_handles = max_handles
+        self.handles = OrderedDict()
+        self.inherited_handles = []
+        self.lock = threading.RLock()
+        self.pid = os.getpid()
+
+    def __len__(self):
+        return len(self.handles)
+
+    def open(self, file_name, update=False, vector=False):
+        """Gets a cached dataset handle or opens the dataset.
+
+        Args:
+            file_name (str): The dataset file directory and name (``/vsi*`` paths are supported).
+            update (bool): Open the dataset in update mode (default: ``False``).
+            vector (bool): Open the dataset with ``ogr`` (default: ``False`` opens a raster with ``gdal``).
+
+        Returns:
+            ``osgeo.gdal.Dataset`` or ``osgeo.ogr.DataSource``: The dataset (``ogr`` returns ``None`` if the dataset cannot be opened).
+
+        Raises:
+            RuntimeError: If ``gdal`` cannot open a raster dataset.
+        """
+        key = (self.get_path(file_name), self.get_signature(file_name), bool(update), bool(vector),
+               threading.get_ident())
+        with self.lock:
+            self.reset_after_fork()
+            try:
+                self.handles.move_to_end(key)
+                return self.handles[key]
+            except KeyError:
+                pass
+            if vector:
+                dataset = ogr.Open(file_name, int(update))
+            else:
+                dataset = gdal.Open(file_name, gdal.GA_Update if update else gdal.GA_ReadOnly)
+            if dataset is None:
+                return None
+            self.handles[key] = dataset
+            while len(self.handles) > max(int(self.max_handles), 1):
+                self.close_handle(self.handles.popitem(last=False)[1])
+            return dataset
+
+    def release(self, file_name):
+        """Closes all cached handles of a dataset (for example, before the dataset is overwritten or deleted).
+
+        Args:
+            file_name (str): The dataset file directory and name.
+        """
+        path = self.get_path(file_name)
+        with self.lock:
+            for key in [key for key in self.handles if key[0] == path]:
+                self.close_handle(self.handles.pop(key))
+
+    def clear(self):
+        """Closes all cached handles."""
+        with self.lock:
+            while self.handles:
+                self.close_handle(self.handles.popitem(last=False)[1])
+
+    def reset_after_fork(self):
+        """Detaches the handles inherited from a parent process. The inherited handles are kept (never closed) in
+        ``inherited_handles``, because closing them in the child would flush (update-mode) datasets that the parent
+        process still owns. Forked pool workers terminate with ``os._exit``, which does not close the handles either."""
+        if os.getpid() != self.pid:
+            self.inherited_handles.extend(self.handles.values())
+            self.handles = OrderedDict()
+            self.pid = os.getpid()
+
+    @staticmethod
+    def close_handle(dataset):
+        """Flushes a dataset handle before the cache drops its reference."""
+        try:
+            dataset.FlushCache()
+        except (AttributeError, RuntimeError):
+            pass
+
+    @staticmethod
+    def get_path(file_name):
+        """Returns a normalized absolute path (``/vsi*`` paths remain unchanged)."""
+        file_name = str(file_name)
+        if file_name.startswith("/vsi"):
+            return file_name
+        return os.path.abspath(file_name)
+
+    @staticmethod
+    def get_signature(file_name):
+        """Returns the modification time and size of a file to identify modified files."""
+        try:
+            stat = os.stat(file_name)
+            return stat.st_mtime_ns, stat.st_size
+        except (OSError, TypeError, ValueError):
+            pass
+        stat = gdal.VSIStatL(str(file_name))
+        if stat is None:
+            return None
+        return stat.mtime, stat.size
+
+
+dataset_cache = DatasetCache()
+
+
+def open_dataset(file_name, update=False, vector=False):
+    """Opens a raster or vector dataset through the process-wide ``DatasetCache``.
+
+    Args:
+        file_name (str): The dataset file directory and name.
+        update (bool): Open the dataset in update mode (default: ``False``).
+        vector (bool): Open a vector dataset with ``ogr`` (default: ``False`` opens a raster with ``gdal``).
+
+    Returns:
+        ``osgeo.gdal.Dataset`` or ``osgeo.ogr.DataSource``: The cached dataset handle.
+    """
+    return dataset_cache.open(file_name, update=update, vector=vector)
+
+
+def release_dataset(file_name):
+    """Closes all cached handles of a dataset (use before overwriting or deleting files).
+
+    Args:
+        file_name (str): The dataset file directory and name.
+    """
+    dataset_cache.release(file_name)
+
+
+def set_max_open_datasets(max_handles):
+    """Sets the maximum number of open dataset handles in the process-wide cache.
+
+    Args:
+        max_handles (int): Maximum number of simultaneously open handles.
+    """
+    with dataset_cache.lock:
+        dataset_cache.max_handles = int(max_handles)
+        while len(dataset_cache.handles) > max(dataset_cache.max_handles, 1):
+            dataset_cache.close_handle(dataset_cache.handles.popitem(last=False)[1])
@@ -1,7 +1,158 @@
 from .raster_mgmt import *
 from .shp_mgmt import *
+import threading
+from collections import OrderedDict
 gdal.UseExceptions()
 
+max_dataset_infos = 1024
+dataset_info_cache = OrderedDict()
+dataset_info_cache_lock = threading.Lock()
+
+
+class DatasetInfo:
+    """Compact metadata summary of a raster or vector dataset, built once with ``describe``.
+
+    Attributes:
+        file_name (str): The dataset file directory and name.
+        dataset_type (str): Either ``"raster"``, ``"vector"``, ``"mixed"``, or ``"empty"``.
+        cols (int): Number of raster columns (``0`` for vectors).
+        rows (int): Number of raster rows (``0`` for vectors).
+        band_count (int): Number of raster bands (or vector layers).
+        dtypes (tuple): ``numpy`` data types of the raster bands.
+        nodata (tuple): No-data values of the raster bands (``None`` if not defined).
+        geo_transform (tuple): The raster GeoTransformation (``None`` for vectors).
+        epsg (int): The EPSG authority code (``None`` if it could not be identified).
+        extent (tuple): Bounding box ``(x_min, y_min, x_max, y_max)``.
+        block_size (tuple): Raster block size ``(block_x, block_y)`` of the first band.
+        feature_count (int): Number of features in the first vector layer (``0`` for rasters).
+    """
+    __slots__ = ("file_name", "dataset_type", "cols", "rows", "band_count", "dtypes", "nodata", "geo_transform", "epsg",
+                 "extent", "block_size", "feature_count")
+
+    def __init__(self, file_name=None, dataset_type="empty", cols=0, rows=0, band_count=0, dtypes=(), nodata=(),
+                 geo_transform=None, epsg=None, extent=None, block_size=None, feature_count=0):
+        self.file_name = file_name
+        self.dataset_type = dataset_type
+        self.cols = cols
+        self.rows = rows
+        self.band_count = band_count
+        self.dtypes = dtypes
+        self.nodata = nodata
+        self.geo_transform = geo_transform
+        self.epsg = epsg
+        self.extent = extent
+        self.block_size = block_size
+        self.feature_count = feature_count
+
+    def __repr__(self):
+        return "DatasetInfo(%s)" % ", ".join("%s=%r" % (name, getattr(self, name)) for name in self.__slots__)
+
+    @property
+    def shape(self):
+        """tuple: Raster shape ``(rows, cols)``."""
+        return self.rows, self.cols
+
+    def to_dict(self):
+        """Returns the metadata as ``dict`` (for example, to build a ``pandas.DataFrame`` of many datasets)."""
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+def describe(dataset):
+    """Summarizes the metadata of a raster or vector dataset. The summary is memoized by the file path, modification
+    time, and size, such that repeated calls for unchanged files neither re-open the files nor re-identify their
+    spatial reference. The memo keeps the ``max_dataset_infos`` most recently described files (thread-safe).
+
+    Args:
+        dataset (str or ``osgeo.gdal.Dataset`` or ``osgeo.ogr.DataSource``): A dataset file name or an open dataset.
+
+    Returns:
+        DatasetInfo: The dataset metadata (``None`` if the dataset cannot be opened).
+    """
+    if isinstance(dataset, (str, os.PathLike)):
+        file_name = str(dataset)
+    else:
+        try:
+            file_name = dataset.GetDescription()
+        except AttributeError:
+            file_name = ""
+        if not file_name:
+            return build_dataset_info(dataset)
+
+    path = DatasetCache.get_path(file_name)
+    signature = DatasetCache.get_signature(file_name)
+    with dataset_info_cache_lock:
+        try:
+            cached_signature, info = dataset_info_cache[path]
+            if signature is not None and cached_signature == signature:
+                dataset_info_cache.move_to_end(path)
+                return info
+        except KeyError:
+            pass
+
+    if isinstance(dataset, (str, os.PathLike)):
+        try:
+            dataset = open_dataset(file_name)
+        except RuntimeError:
+            dataset = open_dataset(file_name, vector=True)
+        if dataset is None:
+            logging.error("Could not open %s." % str(file_name))
+            return None
+    info = build_dataset_info(dataset)
+    if info is not None and signature is not None:
+        with dataset_info_cache_lock:
+            dataset_info_cache[path] = (signature, info)
+            dataset_info_cache.move_to_end(path)
+            while len(dataset_info_cache) > max(int(max_dataset_infos), 1):
+                dataset_info_cache.popitem(last=False)
+    return info
+
+
+def build_dataset_info(dataset):
+    """Builds a ``DatasetInfo`` from an open dataset (without memoization; use ``describe`` instead).
+
+    Args:
+        dataset (``osgeo.gdal.Dataset`` or ``osgeo.ogr.DataSource``): An open dataset.
+
+    Returns:
+        DatasetInfo: The dataset metadata (``None`` if ``dataset`` is not a dataset).
+    """
+    # srs_mgmt builds on this module and holds the (memoized) EPSG identification
+    from .srs_mgmt import identify_epsg
+
+    dataset_type = verify_dataset(dataset)
+    if dataset_type is None:
+        return None
+    try:
+        file_name = dataset.GetDescription()
+    except AttributeError:
+        file_name = None
+    info = DatasetInfo(file_name=file_name, dataset_type=dataset_type)
+
+    if dataset_type in ("raster", "mixed"):
+        bands = [dataset.GetRasterBand(i) for i in range(1, dataset.RasterCount + 1)]
+        info.cols, info.rows = dataset.RasterXSize, dataset.RasterYSize
+        info.band_count = len(bands)
+        info.dtypes = tuple(np.dtype(gdal_numpy_dtype_dict.get(band.DataType, np.float64)).name for band in bands)
+        info.nodata = tuple(band.GetNoDataValue() for band in bands)
+        info.block_size = tuple(bands[0].GetBlockSize())
+        info.geo_transform = tuple(dataset.GetGeoTransform())
+        corners_x, corners_y = offsets2coords(info.geo_transform, [0, info.cols, 0, info.cols],
+                                              [0, 0, info.rows, info.rows], center=False)
+        info.extent = (float(corners_x.min()), float(corners_y.min()),
+                       float(corners_x.max()), float(corners_y.max()))
+        info.epsg = identify_epsg(dataset.GetProjection())
+    else:
+        layer = dataset.GetLayer()
+        info.band_count = dataset.GetLayerCount()
+        if layer is not None:
+            info.feature_count = layer.GetFeatureCount()
+            x_min, x_max, y_min, y_max = layer.GetExtent()
+            info.extent = (x_min, y_min, x_max, y_max)
+            spatial_ref = layer.GetSpatialRef()
+            if spatial_ref is not None:
+                info.epsg = identify_epsg(spatial_ref.ExportToWkt())
+    return info
+
 
 def coords2offset(geo_transform, x_coord, y_coord):
     """ Returns x-y pixel offset (inverse of the ``offset2coords`` function).
@@ -15,21 +166,53 @@ def coords2offset(geo_transform, x_coord, y_coord):
         tuple: Number of pixels ``(offset_x, offset_y)``,  both ``int`` .
     """
     try:
-        origin_x = geo_transform[0]
-        origin_y = geo_transform[3]
-        pixel_width = geo_transform[1]
-        pixel_height = geo_transform[5]
-    except IndexError:
+        if geo_transform[1] * geo_transform[5] - geo_transform[2] * geo_transform[4] == 0:
+            logging.error("Non-invertible geo_transform (the determinant is 0): %s" % str(geo_transform))
+            return None
+        offset_x, offset_y = coords2offsets(geo_transform, x_coord, y_coord, rounding=None)
+    except (IndexError, TypeError):
         logging.error("Invalid geo_transform object (%s)." % str(geo_transform))
         return None
-
-    try:
-        offset_x = int((x_coord - origin_x) / pixel_width)
-        offset_y = int((y_coord - origin_y) / pixel_height)
     except ValueError:
         logging.error("geo_transform tuple contains non-numeric data: %s" % str(geo_transform))
         return None
-    return offset_x, offset_y
+    return int(offset_x), int(offset_y)
+
+
+def coords2offsets(geo_transform, x_coords, y_coords, rounding="floor", shape=None):
+    """Converts arrays of x-y coordinates to pixel offsets with the inverse of the full affine GeoTransformation
+    (including the rotation terms ``geo_transform[2]`` and ``geo_transform[4]``).
+
+    Args:
+        geo_transform: osgeo.gdal.Dataset.GetGeoTransform() object
+        x_coords (ndarray): x-coordinates (any shape or a number).
+        y_coords (ndarray): y-coordinates (same shape as ``x_coords``).
+        rounding (str): Either ``"floor"`` (default; the pixel that contains the coordinates), ``"round"`` (the
+                        nearest pixel corner), or ``None`` (fractional offsets as ``float``).
+        shape (tuple): Optional raster shape ``(rows, cols)`` for checking if the offsets are within the raster.
+
+    Returns:
+        tuple: Arrays of offsets ``(offset_x, offset_y)`` (``int``, unless ``rounding=None``). If ``shape`` is
+        provided, a third (boolean) array indicates which offsets lie inside the raster.
+
+    Raises:
+        ValueError: If ``geo_transform`` is not invertible (its determinant is ``0``).
+    """
+    x_coords = np.asarray(x_coords, dtype=np.float64) - geo_transform[0]
+    y_coords = np.asarray(y_coords, dtype=np.float64) - geo_transform[3]
+    determinant = geo_transform[1] * geo_transform[5] - geo_transform[2] * geo_transform[4]
+    if determinant == 0:
+        raise ValueError("geo_transform is not invertible: %s" % str(geo_transform))
+    offset_x = (geo_transform[5] * x_coords - geo_transform[2] * y_coords) / determinant
+    offset_y = (geo_transform[1] * y_coords - geo_transform[4] * x_coords) / determinant
+    if rounding == "floor":
+        offset_x, offset_y = np.floor(offset_x).astype(np.int64), np.floor(offset_y).astype(np.int64)
+    elif rounding == "round":
+        offset_x, offset_y = np.rint(offset_x).astype(np.int64), np.rint(offset_y).astype(np.int64)
+    if shape is None:
+        return offset_x, offset_y
+    inside = (offset_x >= 0) & (offset_x < shape[1]) & (offset_y >= 0) & (offset_y < shape[0])
+    return offset_x, offset_y, inside
 
 
 def get_layer(dataset, band_number=1):
@@ -42,9 +225,10 @@ def get_layer(dataset, band_number=1):
     Returns: 
         dict: ``{GEO-TYPE: if raster: raster_band, if vector: GetLayer(), else: None}``
     """
-    if verify_dataset(dataset) == "raster":
+    dataset_type = verify_dataset(dataset)
+    if dataset_type == "raster":
         return {"type": "raster", "layer": dataset.GetRasterBand(band_number)}
-    if verify_dataset(dataset) == "vector":
+    if dataset_type == "vector":
         return {"type": "vector", "layer":  dataset.GetLayer()}
     return {"type": "None", "layer": None}
 
@@ -61,21 +245,41 @@ def offset2coords(geo_transform, offset_x, offset_y):
         tuple: Two ``float`` numbers of x-y-coordinates ``(x_coord, y_coord)``.
     """
     try:
-        origin_x = geo_transform[0]
-        origin_y = geo_transform[3]
-        pixel_width = geo_transform[1]
-        pixel_height = geo_transform[5]
-    except IndexError:
+        coord_x, coord_y = offsets2coords(geo_transform, offset_x, offset_y)
+    except (IndexError, TypeError):
         logging.error("Invalid geo_transform object (%s)." % str(geo_transform))
         return None
-
-    try:
-        coord_x = origin_x + pixel_width * (offset_x + 0.5)
-        coord_y = origin_y + pixel_height * (offset_y + 0.5)
     except ValueError:
         logging.error("geo_transform tuple contains non-numeric data: %s" % str(geo_transform))
         return None
-    return coord_x, coord_y
+    return float(coord_x), float(coord_y)
+
+
+def offsets2coords(geo_transform, offset_x, offset_y, center=True, shape=None):
+    """Converts arrays of pixel offsets to x-y coordinates with the full affine GeoTransformation (including the
+    rotation terms ``geo_transform[2]`` and ``geo_transform[4]``).
+
+    Args:
+        geo_transform (osgeo.gdal.Dataset.GetGeoTransform): The geo transformation to use.
+        offset_x (ndarray): x number of pixels (any shape or a number).
+        offset_y (ndarray): y number of pixels (same shape as ``offset_x``).
+        center (bool): Return the coordinates of the pixel centers (default: ``True``), otherwise the coordinates of
+                       the upper-left pixel corners.
+        shape (tuple): Optional raster shape ``(rows, cols)`` for checking if the offsets are within the raster.
+
+    Returns:
+        tuple: Arrays of coordinates ``(x_coords, y_coords)`` (``float``). If ``shape`` is provided, a third
+        (boolean) array indicates which offsets lie inside the raster.
+    """
+    offset_x = np.asarray(offset_x, dtype=np.float64)
+    offset_y = np.asarray(offset_y, dtype=np.float64)
+    shift = 0.5 if center else 0.
+    x_coords = geo_transform[0] + (offset_x + shift) * geo_transform[1] + (offset_y + shift) * geo_transform[2]
+    y_coords = geo_transform[3] + (offset_x + shift) * geo_transform[4] + (offset_y + shift) * geo_transform[5]
+    if shape is None:
+        return x_coords, y_coords
+    inside = (offset_x >= 0) & (offset_x < shape[1]) & (offset_y >= 0) & (offset_y < shape[0])
+    return x_coords, y_coords, inside
 
 
 def verify_dataset(dataset):
@@ -4,6 +4,8 @@
 
 from .kml import *
 from .srs_mgmt import *
+from .raster_algebra import *
+from .gridding import *
 gdal.UseExceptions()
 
 
@@ -11,7 +13,7 @@ def float2int(raster_file_name, band_number=1):
     """Converts a float number raster to an integer raster (required for converting a raster to a polygon shapefile).
 
     Args:
-        raster_file_name (str): Target file name, including directory; must end on ``".tif"``.
+        raster_file_name (str): Target file name, including directory; must end on ``".tif"`` (or ``".vrt"``).
         band_number (int): The raster band number to open (default: ``1``).
 
     Returns:
@@ -24,7 +26,7 @@ def float2int(raster_file_name, band_number=1):
     except ValueError:
         logging.error("! Invalid raster pixel values.")
         return raster_file_name
-    new_name = raster_file_name.split(".tif")[0] + "_int.tif"
+    new_name = os.path.splitext(raster_file_name)[0] + "_int.tif"
 
     # get source coordinate system and exit function if not possible
     src_srs = get_srs(raster)
@@ -39,6 +41,98 @@ def float2int(raster_file_name, band_number=1):
     return new_name
 
 
+def float2int_dataset(raster, band):
+    """Converts a raster band to integers in memory (without writing an intermediate file) for ``gdal.Polygonize``.
+    The values are truncated like in ``float2int``, stored in the smallest fitting integer type, and converted block
+    by block to limit the memory usage to the integer raster.
+
+    Args:
+        raster (osgeo.gdal.Dataset): The source raster.
+        band (osgeo.gdal.Band): The source raster band.
+
+    Returns:
+        tuple: ``(dataset, int_band, mask_band)``, where ``dataset`` is a ``MEM`` raster (or the source raster for
+        integer bands) that must be kept alive while using the bands, and ``mask_band`` is ``0`` at no-data pixels.
+        Returns ``None`` if the band contains no valid pixels or values that do not fit in 32-bit integers.
+    """
+    try:
+        if band.DataType in (gdal.GDT_Byte, gdal.GDT_UInt16, gdal.GDT_Int16, gdal.GDT_Int32):
+            # integer bands are polygonized directly with their no-data mask
+            return raster, band, band.GetMaskBand()
+        minimum, maximum = band.ComputeRasterMinMax(False)
+    except AttributeError:
+        logging.error("Could not read raster band type=%s." % str(type(band)))
+        return None
+    except RuntimeError:
+        logging.error("! The raster band contains no valid pixel values.")
+        return None
+    rdtype = get_int_type(np.trunc(minimum), np.trunc(maximum))
+    if rdtype is None:
+        logging.error("! Invalid raster pixel values (range %s to %s)." % (str(minimum), str(maximum)))
+        return None
+
+    dataset, int_band, mask_band = create_int_dataset(band.XSize, band.YSize, rdtype, raster.GetGeoTransform(),
+                                                      raster.GetProjection())
+    block_x, block_y = band.GetBlockSize()
+    for window in iter_windows(band.XSize, band.YSize, block_x, block_y):
+        array = read_raster_window(band, window, nodata=band.GetNoDataValue())[0]
+        write_int_block(int_band, mask_band, array, window[0], window[1])
+    return dataset, int_band, mask_band
+
+
+def create_int_dataset(cols, rows, rdtype, geo_transform, projection):
+    """Creates a ``MEM`` raster with an integer band and a mask band for ``gdal.Polygonize``.
+
+    Args:
+        cols (int): Number of columns.
+        rows (int): Number of rows.
+        rdtype (int): The ``gdal.GDT_*`` integer data type (see ``get_int_type``).
+        geo_transform (tuple): The GeoTransformation of the raster.
+        projection (str): WKT-formatted projection of the raster.
+
+    Returns:
+        tuple: ``(dataset, int_band, mask_band)``
+    """
+    dataset = gdal.GetDriverByName("MEM").Create("", cols, rows, 1, rdtype)
+    dataset.AddBand(gdal.GDT_Byte)
+    dataset.SetGeoTransform(geo_transform)
+    dataset.SetProjection(projection)
+    return dataset, dataset.GetRasterBand(1), dataset.GetRasterBand(2)
+
+
+def write_int_block(int_band, mask_band, array, x_off, y_off):
+    """Truncates a block array (no-data pixels are ``np.nan``) to integers and writes it with its validity mask.
+
+    Args:
+        int_band (osgeo.gdal.Band): The integer band of a ``create_int_dataset`` raster.
+        mask_band (osgeo.gdal.Band): The mask band of a ``create_int_dataset`` raster.
+        array (ndarray): The block array.
+        x_off (int): Column offset of the block.
+        y_off (int): Row offset of the block.
+    """
+    valid = np.isfinite(array)
+    int_band.WriteArray(np.where(valid, np.trunc(array), 0).astype(gdal_numpy_dtype_dict[int_band.DataType]),
+                        x_off, y_off)
+    mask_band.WriteArray(valid.astype(np.uint8), x_off, y_off)
+
+
+def get_int_type(minimum, maximum):
+    """Gets the smallest ``gdal`` integer data type that ``gdal.Polygonize`` supports for a value range.
+
+    Args:
+        minimum (float): The smallest value.
+        maximum (float): The largest value.
+
+    Returns:
+        int: A ``gdal.GDT_*`` data type (``None`` if the range exceeds 32-bit integers).
+    """
+    for rdtype, lower, upper in ((gdal.GDT_Byte, 0, 255), (gdal.GDT_Int16, -2**15, 2**15 - 1),
+                                 (gdal.GDT_UInt16, 0, 2**16 - 1), (gdal.GDT_Int32, -2**31, 2**31 - 1)):
+        if lower <= minimum and maximum <= upper:
+            return rdtype
+    return None
+
+
 def raster2line(raster_file_name, out_shp_fn, pixel_value):
     """Converts a raster to a line shapefile, where ``pixel_value`` determines line start and end points.
     
@@ -51,48 +145,33 @@ def raster2line(raster_file_name, out_shp_fn, pixel_value):
          Writes a new shapefile to disk.
     """
 
-    # calculate max. distance between points
-    # ensures correct neighbourhoods for start and end pts of lines
     raster, array, geo_transform = raster2array(raster_file_name)
-    pixel_width = geo_transform[1]
-    max_distance = np.ceil(np.sqrt(2 * pixel_width**2))
 
     # extract pixels with the user-defined pixel value from the raster array
-    trajectory = np.where(array == pixel_value)
-    if np.count_nonzero(trajectory) == 0:
+    mask = array == pixel_value
+    if not np.any(mask):
         logging.error("! The defined pixel_value (%s) does not occur in the raster band." % str(pixel_value))
         return None
 
-    # convert pixel offset to coordinates and append to nested list of points
-    points = []
-    count = 0
-    for offset_y in trajectory[0]:
-        offset_x = trajectory[1][count]
-        points.append(offset2coords(geo_transform, offset_x, offset_y))
-        count += 1
-
-    # create multiline (write points dictionary to line geometry (wkbMultiLineString)
+    # merge 8-neighbour pixel runs into continuous lines and convert pixel offsets to coordinates
+    nodes = np.flatnonzero(mask)
+    x_coords, y_coords = offsets2coords(geo_transform, nodes % mask.shape[1], nodes // mask.shape[1])
+    x_coords, y_coords = x_coords.tolist(), y_coords.tolist()
     multi_line = ogr.Geometry(ogr.wkbMultiLineString)
-    for i in itertools.combinations(points, 2):
-        point1 = ogr.Geometry(ogr.wkbPoint)
-        point1.AddPoint(i[0][0], i[0][1])
-        point2 = ogr.Geometry(ogr.wkbPoint)
-        point2.AddPoint(i[1][0], i[1][1])
-
-        distance = point1.Distance(point2)
-        if distance < max_distance:
-            line = ogr.Geometry(ogr.wkbLineString)
-            line.AddPoint(i[0][0], i[0][1])
-            line.AddPoint(i[1][0], i[1][1])
-            multi_line.AddGeometry(line)
-
-    # write multiline (wkbMultiLineString2shp) to shapefile
+    for chain in trace_pixel_lines(mask):
+        line = ogr.Geometry(ogr.wkbLineString)
+        for node in chain:
+            line.AddPoint_2D(x_coords[node], y_coords[node])
+        multi_line.AddGeometry(line)
+
+    # write multiline (wkbMultiLineString2shp) to shapefile in one transaction
     new_shp = create_shp(out_shp_fn, layer_name="raster_pts", layer_type="line")
     lyr = new_shp.GetLayer()
-    feature_def = lyr.GetLayerDefn()
-    new_line_feat = ogr.Feature(feature_def)
+    lyr.StartTransaction()
+    new_line_feat = ogr.Feature(lyr.GetLayerDefn())
     new_line_feat.SetGeometry(multi_line)
     lyr.CreateFeature(new_line_feat)
+    lyr.CommitTransaction()
 
     # create projection file
     srs = get_srs(raster)
@@ -100,74 +179,379 @@ def raster2line(raster_file_name, out_shp_fn, pixel_value):
     print(" * success (raster2line): wrote %s" % str(out_shp_fn))
 
 
-def raster2polygon(file_name, out_shp_fn, band_number=1, field_name="values"):
+def trace_pixel_lines(mask):
+    """Traces 8-neighbour connected pixels of a boolean mask and merges them into continuous lines, which end at
+    line ends and junctions. Diagonal neighbours are only connected if no pixel links them orthogonally. The runtime is
+    linear in the number of ``True`` pixels.
+
+    Args:
+        mask (ndarray): Two-dimensional boolean array of the pixels to connect.
+
+    Returns:
+        list: Lists of node indices (one list per line), where the nodes are the ``True`` pixels of ``mask`` in
+        row-major order (i.e., the indices refer to ``np.flatnonzero(mask)``). Closed loops start and end at the same
+        node. Isolated pixels are not part of any line.
+    """
+    mask = np.asarray(mask, dtype=bool)
+    index = np.arange(mask.size).reshape(mask.shape)
+    orthogonal_ne = mask[:-1, 1:] | mask[1:, :-1]
+    orthogonal_nw = mask[:-1, :-1] | mask[1:, 1:]
+    neighbours = [
+        (mask[:, :-1] & mask[:, 1:], index[:, :-1], index[:, 1:]),
+        (mask[:-1, :] & mask[1:, :], index[:-1, :], index[1:, :]),
+        (mask[:-1, :-1] & mask[1:, 1:] & ~orthogonal_ne, index[:-1, :-1], index[1:, 1:]),
+        (mask[:-1, 1:] & mask[1:, :-1] & ~orthogonal_nw, index[:-1, 1:], index[1:, :-1]),
+    ]
+    rank = np.cumsum(mask.ravel()) - 1
+    start = np.concatenate([rank[first[linked]] for linked, first, second in neighbours])
+    end = np.concatenate([rank[second[linked]] for linked, first, second in neighbours])
+
+    # adjacency lists of the pixel graph (compressed sparse rows)
+    n_nodes = int(rank[-1]) + 1 if mask.size else 0
+    n_edges = start.size
+    from_nodes = np.concatenate((start, end))
+    order = np.argsort(from_nodes, kind="stable")
+    to_nodes = np.concatenate((end, start))[order].tolist()
+    edge_ids = np.tile(np.arange(n_edges), 2)[order].tolist()
+    degree = np.bincount(from_nodes, minlength=n_nodes)
+    pointer = np.concatenate(([0], np.cumsum(degree))).tolist()
+    degree = degree.tolist()
+    visited = [False] * n_edges
+
+    def walk(node, position):
+        chain = [node]
+        while position is not None:
+            visited[edge_ids[position]] = True
+            node = to_nodes[position]
+            chain.append(node)
+            position = None
+            if degree[node] == 2:
+                for candidate in range(pointer[node], pointer[node + 1]):
+                    if not visited[edge_ids[candidate]]:
+                        position = candidate
+                        break
+        return chain
+
+    lines = []
+    # open lines start at line ends and junctions, the remaining edges form closed loops
+    for loops in (False, True):
+        for node in range(n_nodes):
+            if (degree[node] == 2) is not loops:
+                continue
+            for position in range(pointer[node], pointer[node + 1]):
+                if not visited[edge_ids[position]]:
+                    lines.append(walk(node, position))
+    return lines
+
+
+def raster2polygon(file_name, out_shp_fn, band_number=1, field_name="values", tile_size=None, workers=1):
     """Converts a raster to a polygon shapefile.
 
     Args:
-        file_name (str): Target file name, including directory; must end on ``".tif"``
-        out_shp_fn (str): Shapefile name (with directory e.g., ``"C:/temp/poly.shp"``)
+        file_name (str): Target file name, including directory; must end on ``".tif"`` (or ``".vrt"``)
+        out_shp_fn (str): Shapefile name (with directory e.g., ``"C:/temp/poly.shp"``), or a GeoPackage
+                          (``".gpkg"``) or FlatGeobuf (``".fgb"``) name to write a layer with a spatial index.
         band_number (int): Raster band number to open (default: ``1``)
         field_name (str): Field name where raster pixel values will be stored (default: ``"values"``)
-        add_area (bool): If ``True``, an "area" field will be added, where the area
-                          in the shapefiles unit system is calculated (default: ``False``)
+        tile_size (int): Polygonize tiles of ``tile_size`` x ``tile_size`` pixels and dissolve polygons with the same
+                         value across tile seams (default: ``None`` polygonizes the band at once, or uses tiles of
+                         ``2048`` pixels if ``workers != 1``).
+        workers (int): Number of worker processes for polygonizing tiles and dissolving seams (default: ``1``;
+                       ``None`` uses all CPU cores).
 
      Returns:
          osgeo.ogr.DataSource: Python object of the provided ``out_shp_fn``.
+
+    Hint:
+        Tiled polygonization yields the same (4-connected) polygons as the single-pass mode, but the vertices along
+        tile seams and the order of the features may differ.
     """
     logging.info(" * Polygonizing %s ..." % str(file_name))
-    # ensure that the input raster contains integer values only and open the input raster
-    file_name = float2int(file_name)
     raster, raster_band = open_raster(file_name, band_number=band_number)
+    srs = get_srs(raster)
+    if workers != 1 and not tile_size:
+        tile_size = 2048
 
-    # create new shapefile with the create_shp function
-    new_shp = create_shp(out_shp_fn, layer_name="raster_data", layer_type="polygon")
+    # create new polygon dataset and define the value field
+    new_shp = create_vector_dataset(out_shp_fn, layer_name="raster_data", layer_type="polygon", srs=srs)
     dst_layer = new_shp.GetLayer()
+    dst_layer.CreateField(ogr.FieldDefn(field_name, ogr.OFTInteger))
 
-    # create new field to define values
-    new_field = ogr.FieldDefn(field_name, ogr.OFTInteger)
-    dst_layer.CreateField(new_field)
-
-    # Polygonize(band, hMaskBand[optional]=None, destination lyr, field ID, papszOptions=[], callback=None)
-    gdal.Polygonize(raster_band, None, dst_layer, 0, [], callback=None)
+    dst_layer.StartTransaction()
+    if not tile_size:
+        # ensure that the polygonized band contains integer values only
+        try:
+            int_raster, int_band, mask_band = float2int_dataset(raster, raster_band)
+        except TypeError:
+            dst_layer.RollbackTransaction()
+            return None
+        # Polygonize(band, hMaskBand[optional]=None, destination lyr, field ID, papszOptions=[], callback=None)
+        gdal.Polygonize(int_band, mask_band, dst_layer, 0, [], callback=None)
+    else:
+        polygons = polygonize_tiles(file_name, band_number, tile_size, workers=workers)
+        for value, wkb in polygons:
+            feature = ogr.Feature(dst_layer.GetLayerDefn())
+            feature.SetField(0, value)
+            feature.SetGeometry(ogr.CreateGeometryFromWkb(wkb))
+            dst_layer.CreateFeature(feature)
+    dst_layer.CommitTransaction()
 
     # create projection file
-    srs = get_srs(raster)
-    make_prj(out_shp_fn, int(srs.GetAuthorityCode(None)))
+    if out_shp_fn.lower().endswith(".shp"):
+        make_prj(out_shp_fn, int(srs.GetAuthorityCode(None)))
     logging.info(" * success (Polygonize): wrote %s" % str(out_shp_fn))
     return new_shp
 
 
-def rasterize(in_shp_file_name, out_raster_file_name, pixel_size=10, no_data_value=-9999,
-              rdtype=gdal.GDT_Float32, overwrite=True, interpolate_gap_pixels=False, **kwargs):
+def polygonize_tiles(file_name, band_number=1, tile_size=2048, workers=1):
+    """Polygonizes a raster band tile by tile (in parallel) and dissolves the polygons that share an edge on a tile
+    seam and have the same value. The tiles are polygonized and dissolved in pixel coordinates, where the vertices on
+    tile seams match exactly (also for rotated rasters), and the GeoTransformation of the raster is applied once per
+    output polygon. This function is called by ``raster2polygon``.
+
+    Args:
+        file_name (str): Raster file name, including directory.
+        band_number (int): Raster band number to polygonize (default: ``1``).
+        tile_size (int): Tile size in pixels (default: ``2048``).
+        workers (int): Number of worker processes (default: ``1``).
+
+    Returns:
+        list: Polygons as ``(value, wkb)`` tuples.
+    """
+    raster, band = open_raster(file_name, band_number=band_number)
+    geo_transform = raster.GetGeoTransform()
+    tasks = ((file_name, band_number, window) for window in iter_windows(band.XSize, band.YSize, tile_size, tile_size))
+    polygons = []
+    seam_polygons = []
+    # seam edges by (axis, seam coordinate, value) as [edges before the seam, edges after the seam]
+    seam_edges = {}
+    for tile_polygons in map_bounded(polygonize_tile, tasks, workers=workers):
+        for value, wkb, edges in tile_polygons:
+            if not edges:
+                polygons.append((value, wkb))
+                continue
+            for axis, coordinate, side, start, stop in edges:
+                seam_edges.setdefault((axis, coordinate, value), ([], []))[side].append((start, stop,
+                                                                                        len(seam_polygons)))
+            seam_polygons.append((value, wkb))
+
+    # only dissolve polygons that share an edge (rather than all polygons of one value) to balance the workers
+    groups = group_seam_polygons(len(seam_polygons), seam_edges.values())
+    tasks = ((seam_polygons[group[0]][0], [seam_polygons[i][1] for i in group], geo_transform) for group in groups)
+    for dissolved in map_bounded(dissolve_polygons, tasks, workers=workers):
+        polygons.extend(dissolved)
+    return polygons
+
+
+def polygonize_tile(task):
+    """Polygonizes one raster tile in pixel coordinates (worker function of ``polygonize_tiles``).
+
+    Args:
+        task (tuple): ``(file_name, band_number, window)``, where ``window`` is ``(x_off, y_off, x_size, y_size)``.
+
+    Returns:
+        list: Polygons as ``(value, wkb, seam_edges)`` tuples. Polygons with edges on a tile edge that is not a raster
+        edge are in pixel coordinates and ``seam_edges`` lists these edges (see ``get_seam_edges``); all other
+        polygons are in raster coordinates and ``seam_edges`` is empty.
+    """
+    file_name, band_number, window = task
+    raster, band = open_raster(file_name, band_number=band_number)
+    x_off, y_off, x_size, y_size = window
+    array = read_raster_window(band, window, nodata=band.GetNoDataValue())[0].astype(np.float64)
+    valid = np.isfinite(array)
+    if not np.any(valid):
+        return []
+    rdtype = get_int_type(np.trunc(array[valid].min()), np.trunc(array[valid].max()))
+    if rdtype is None:
+        logging.error("! Invalid raster pixel values in window %s." % str(window))
+        return []
+    # integer pixel offsets as GeoTransformation yield exact (integer) vertices on the tile seams
+    pixel_geo_transform = (float(x_off), 1., 0., float(y_off), 0., 1.)
+    dataset, int_band, mask_band = create_int_dataset(x_size, y_size, rdtype, pixel_geo_transform, "")
+    write_int_block(int_band, mask_band, array, 0, 0)
+    layer = ogr.GetDriverByName("Memory").CreateDataSource("").CreateLayer("tile", geom_type=ogr.wkbPolygon)
+    layer.CreateField(ogr.FieldDefn("values", ogr.OFTInteger))
+    gdal.Polygonize(int_band, mask_band, layer, 0, [], callback=None)
+
+    # tile edges inside the raster as (axis, pixel coordinate, side), where side 1 is the tile after the seam
+    seams = [(0, x_off, 1) if x_off > 0 else None, (0, x_off + x_size, 0) if x_off + x_size < band.XSize else None,
+             (1, y_off, 1) if y_off > 0 else None, (1, y_off + y_size, 0) if y_off + y_size < band.YSize else None]
+    seams = [seam for seam in seams if seam is not None]
+
+    polygons = []
+    layer.ResetReading()
+    for feature in layer:
+        geometry = feature.GetGeometryRef()
+        edges = get_seam_edges(geometry, seams)
+        if not edges:
+            apply_geo_transform(geometry, raster.GetGeoTransform())
+        polygons.append((feature.GetField(0), bytes(geometry.ExportToWkb()), edges))
+    return polygons
+
+
+def get_seam_edges(geometry, seams):
+    """Gets the edges of a polygon (in pixel coordinates) that lie on tile seams.
+
+    Args:
+        geometry (osgeo.ogr.Geometry): A polygon in pixel coordinates.
+        seams (list): Seams as ``(axis, coordinate, side)`` tuples, where ``axis`` is ``0`` for vertical (x) and ``1``
+            for horizontal (y) seams, and ``side`` is ``1`` if the polygon lies after the seam (else ``0``).
+
+    Returns:
+        list: Edges as ``(axis, coordinate, side, start, stop)`` tuples, where ``start`` and ``stop`` delimit the edge
+        along the seam.
+    """
+    edges = []
+    if not seams:
+        return edges
+    for i in range(geometry.GetGeometryCount()):
+        points = np.array(geometry.GetGeometryRef(i).GetPoints(), dtype=np.float64)[:, 0:2]
+        for axis, coordinate, side in seams:
+            on_seam = points[:, axis] == coordinate
+            # consecutive vertices on the seam line
+            segments = np.flatnonzero(on_seam[:-1] & on_seam[1:])
+            along = points[:, 1 - axis]
+            for start, stop in zip(along[segments], along[segments + 1]):
+                if start != stop:
+                    edges.append((axis, coordinate, side, float(min(start, stop)), float(max(start, stop))))
+    return edges
+
+
+def group_seam_polygons(count, seam_edges):
+    """Groups seam polygons that share (overlapping) edges on both sides of a tile seam, directly or through other
+    polygons. Polygons can only dissolve into one polygon if they are in the same group.
+
+    Args:
+        count (int): Number of seam polygons.
+        seam_edges (list): Edges of one seam and value each as ``(edges_before, edges_after)``, where the edges are
+            ``(start, stop, polygon_index)`` tuples.
+
+    Returns:
+        list: Groups as lists of polygon indices.
+    """
+    parents = list(range(count))
+
+    def find(i):
+        while parents[i] != i:
+            parents[i] = parents[parents[i]]
+            i = parents[i]
+        return i
+
+    for edges_before, edges_after in seam_edges:
+        # the edges on one side of a seam do not overlap each other; merge the sorted edges of both sides
+        edges_before = sorted(edges_before)
+        edges_after = sorted(edges_after)
+        i = j = 0
+        while i < len(edges_before) and j < len(edges_after):
+            start_before, stop_before, polygon_before = edges_before[i]
+            start_after, stop_after, polygon_after = edges_after[j]
+            if max(start_before, start_after) < min(stop_before, stop_after):
+                parents[find(polygon_before)] = find(polygon_after)
+            if stop_before < stop_after:
+                i += 1
+            else:
+                j += 1
+
+    groups = {}
+    for i in range(count):
+        groups.setdefault(find(i), []).append(i)
+    return list(groups.values())
+
+
+def dissolve_polygons(task):
+    """Dissolves polygons with the same value in pixel coordinates, splits the result into disjoint polygons, and
+    transforms them to raster coordinates (worker function of ``polygonize_tiles``).
+
+    Args:
+        task (tuple): ``(value, wkbs, geo_transform)``, where ``wkbs`` is a list of WKB-formatted polygons in pixel
+            coordinates and ``geo_transform`` is the GeoTransformation of the raster.
+
+    Returns:
+        list: Polygons as ``(value, wkb)`` tuples.
+    """
+    value, wkbs, geo_transform = task
+    multi_polygon = ogr.Geometry(ogr.wkbMultiPolygon)
+    for wkb in wkbs:
+        multi_polygon.AddGeometry(ogr.CreateGeometryFromWkb(wkb))
+    dissolved = multi_polygon.UnionCascaded()
+    if dissolved.GetGeometryType() == ogr.wkbPolygon:
+        geometries = [dissolved]
+    else:
+        geometries = [dissolved.GetGeometryRef(i) for i in range(dissolved.GetGeometryCount())]
+    polygons = []
+    for geometry in geometries:
+        apply_geo_transform(geometry, geo_transform)
+        polygons.append((value, bytes(geometry.ExportToWkb())))
+    return polygons
+
+
+def apply_geo_transform(geometry, geo_transform):
+    """Transforms a polygon from pixel coordinates to raster coordinates (in place).
+
+    Args:
+        geometry (osgeo.ogr.Geometry): A polygon in pixel coordinates.
+        geo_transform (tuple): A ``osgeo.gdal.Dataset.GetGeoTransform`` object.
+    """
+    for i in range(geometry.GetGeometryCount()):
+        ring = geometry.GetGeometryRef(i)
+        for j in range(ring.GetPointCount()):
+            x, y = gdal.ApplyGeoTransform(geo_transform, ring.GetX(j), ring.GetY(j))
+            ring.SetPoint_2D(j, x, y)
+
+
+def rasterize(in_shp_file_name, out_raster_file_name=None, pixel_size=10, no_data_value=-9999,
+              rdtype=gdal.GDT_Float32, overwrite=True, interpolate_gap_pixels=False, cog=False, overviews=None,
+              resampling="average", tile_size=None, workers=1, output="file", like=None, **kwargs):
     """Converts any ESRI shapefile to a raster.
 
     Args:
         in_shp_file_name (str): A shapefile name (with directory e.g., ``"C:/temp/poly.shp"``)
-        out_raster_file_name (str): Target file name, including directory; must end on ``".tif"``
+        out_raster_file_name (str): Target file name, including directory; must end on ``".tif"`` (not required
+                                    with ``output="array"``)
         pixel_size (float): Pixel size as multiple of length units defined in the spatial reference (default: ``10``)
         no_data_value (int OR float): Numeric value for no-data pixels (default: ``-9999``)
         rdtype (gdal.GDALDataType): The raster data type (default: ``gdal.GDT_Float32`` (32 bit floating point)
         overwrite (bool): Overwrite existing files (default: ``True``)
         interpolate_gap_pixels (bool): Fill empty pixels that are not touched by a shapefile element with interpolated values (default: ``False``)
+        cog (bool): Write a Cloud-Optimized GeoTIFF with internal tiles and overviews (default: ``False``)
+        overviews (list): Overview levels as decimation factors, for example, ``[2, 4, 8, 16]`` (default: ``None``)
+        resampling (str): Resampling method for overviews (default: ``"average"``)
+        tile_size (int): Burn the features window by window into a tiled, compressed GeoTIFF with windows of
+                         ``tile_size`` x ``tile_size`` pixels, which limits the memory usage; must be a multiple of
+                         ``16`` (GeoTIFF block size) (default: ``None`` burns
+                         the full extent at once, or uses windows of ``1024`` pixels if ``workers != 1`` or
+                         ``interpolate_gap_pixels=True``).
+        workers (int): Number of worker processes for burning or interpolating windows (default: ``1``; ``None`` uses
+                       all CPU cores).
+        output (str): Either ``"file"`` (default) writes ``out_raster_file_name``, or ``"array"`` returns the raster
+                      as ``numpy`` array without writing to the disk.
+        like (str): Raster file name, which defines the grid (extent, pixel size, and projection) of the output
+                    raster, where features in another spatial reference system are reprojected (default: ``None``
+                    uses the extent of the shapefile and ``pixel_size``).
 
     Keyword Args:
-        field_name (str): Name of the shapefile's field with values to burn to raster pixel values.
+        field_name (``str`` or ``list``): Name of the shapefile's (numeric) field with values to burn to raster pixel
+                                          values, or a list of field names to burn into one band each (only the first
+                                          field is used with ``interpolate_gap_pixels``).
         radius1 (float): Define the x-radius for interpolating pixels (default: ``-1``, corresponding to infinity). Only applicable ``with interpolate_gap_pixels``.
         radius2 (float): Define the y-radius for interpolating pixels (default: ``-1``, corresponding to infinity). Only applicable ``with interpolate_gap_pixels``.
         power (float): Power of the function for interpolating pixel values (default: ``1.0``, corresponding to linear).
         smoothing (float): Smoothing parameter for interpolating pixel values (default: ``0.0``).
         min_points (int): Minimum number of points to use for interpolation. If the interpolator cannot find at least ``min_points`` for a pixel, it assigns a ``no_data`` value to that pixel  (default: ``0``).
         max_points (int): Maximum number of points to use for interpolation. The interpolator will not use more than ``max_points`` closest points to interpolate a pixel value (default: ``0``).
+        algorithm (str): Gridding algorithm with ``interpolate_gap_pixels``: ``"invdist"`` (default), or ``"mean"``, ``"min"``, ``"max"``, or ``"count"`` of the points in every pixel.
 
 
     Hints:
         More information on pixel value interpolation:
         * ``interpolate_gap_pixels=True`` interpolates values at pixels that are not touched by any las point.
-        * The pixel value interpolation uses ``gdal_grid`` (i.e., its Python bindings through ``gdal.Grid()``).
-        * Control the interpolation parameters with the keyword arguments ``radius1``, ``radius2``, ``power``, ``max_points``, ``min_points``,  and ``smoothing``..
+        * The pixel value interpolation uses ``grid_points`` (KD-tree based inverse distance weighting with the same parameters as ``gdal_grid``'s ``invdist`` algorithm), which runs tile by tile with ``workers`` processes.
+        * Control the interpolation parameters with the keyword arguments ``radius1``, ``radius2``, ``power``, ``max_points``, ``min_points``,  and ``smoothing``. Define ``max_points`` or the radii to avoid weighting every point for every pixel.
 
     Returns:
         int: Creates the GeoTIFF raster defined with ``out_raster_file_name`` (success: ``0``, otherwise ``None``).
+        With ``output="array"``: a tuple of ``(array, geo_transform, srs)``, where ``array`` has the shape
+        ``(bands, rows, cols)`` for multiple fields and no-data pixels are ``np.nan``.
     """
 
     default_keys = {"radius1": -1,
@@ -180,93 +564,633 @@ def rasterize(in_shp_file_name, out_raster_file_name, pixel_size=10, no_data_val
 
     for k in default_keys.keys():
         if kwargs.get(k):
-            default_keys[k] = str(kwargs.get(k))
+            default_keys[k] = kwargs.get(k)
+
+    field_names = kwargs.get("field_name") or []
+    if isinstance(field_names, str):
+        field_names = [field_names]
+    field_names = list(field_names)
+    if output == "file" and not out_raster_file_name:
+        logging.error("! rasterize requires an out_raster_file_name with output=\"file\".")
+        return None
+    if tile_size and int(tile_size) % 16 != 0:
+        logging.error("! tile_size must be a multiple of 16 (GeoTIFF block size), not %s." % str(tile_size))
+        return None
+    if output == "array":
+        # tiled and interpolated rasters are written to and read from an in-memory file
+        out_raster_file_name = "/vsimem/rasterize_%s.tif" % os.urandom(8).hex()
+        cog = False
+        overviews = None
 
     # check if any action is required
-    if os.path.isfile(out_raster_file_name) and not overwrite:
+    if output == "file" and os.path.isfile(out_raster_file_name) and not overwrite:
         logging.info(" * %s already exists. Nothing to do." % out_raster_file_name)
         return None
 
-    # open data source
+    # open data source (or get its cached handle)
     try:
-        source_ds = ogr.Open(in_shp_file_name)
+        source_ds = open_dataset(in_shp_file_name, vector=True)
     except RuntimeError as err:
         logging.error("! Could not open %s." % str(in_shp_file_name))
         return None
+    if not source_ds:
+        logging.error("! Could not open %s." % str(in_shp_file_name))
+        return None
     source_lyr = source_ds.GetLayer()
 
-    # read extent
-    x_min, x_max, y_min, y_max = source_lyr.GetExtent()
+    # only numeric fields can be burnt into raster bands
+    layer_defn = source_lyr.GetLayerDefn()
+    for field in field_names:
+        field_index = layer_defn.GetFieldIndex(str(field))
+        if field_index < 0:
+            logging.error("! %s has no field named %s." % (str(in_shp_file_name), str(field)))
+            return None
+        if layer_defn.GetFieldDefn(field_index).GetType() not in (ogr.OFTInteger, ogr.OFTInteger64, ogr.OFTReal):
+            logging.error("! The field %s is not numeric (cannot burn %s values)." % (
+                str(field), layer_defn.GetFieldDefn(field_index).GetTypeName()))
+            return None
 
-    # get x and y resolution in number of pixel
-    x_res = int((x_max - x_min) / pixel_size)
-    y_res = int((y_max - y_min) / pixel_size)
+    if like:
+        # align the output raster with the grid of an existing raster
+        try:
+            like_raster = open_dataset(like)
+        except RuntimeError:
+            logging.error("! Could not open %s." % str(like))
+            return None
+        geo_transform = like_raster.GetGeoTransform()
+        x_res, y_res = like_raster.RasterXSize, like_raster.RasterYSize
+        srs = osr.SpatialReference()
+        srs.ImportFromWkt(like_raster.GetProjection())
+        grid_geo_transform = geo_transform
+        pixel_size = abs(geo_transform[1])
+    else:
+        # read extent
+        x_min, x_max, y_min, y_max = source_lyr.GetExtent()
 
-    # get spatial reference system and assign to raster
-    srs = get_srs(source_ds)
-    try:
-        srs.ImportFromEPSG(int(srs.GetAuthorityCode(None)))
-    except RuntimeError as err:
-        logging.error(e)
-        return None
+        # get x and y resolution in number of pixel
+        x_res = int((x_max - x_min) / pixel_size)
+        y_res = int((y_max - y_min) / pixel_size)
+        geo_transform = (x_min, pixel_size, 0, y_max, 0, -pixel_size)
+        grid_geo_transform = (x_min, (x_max - x_min) / x_res, 0, y_max, 0, -(y_max - y_min) / y_res)
+
+        # get spatial reference system and assign to raster
+        srs = get_srs(source_ds)
+        try:
+            srs.ImportFromEPSG(int(srs.GetAuthorityCode(None)))
+        except RuntimeError as err:
+            logging.error(err)
+            return None
 
     if float(pixel_size) < 1.0:
         logging.info("   -- Yeek! This will be a high resolution raster. Be prepared that your system resources will be occupied for a while.")
 
-    # use gdal.Grid if gap interpolation (fill void pixels) is True
+    # interpolate (or bin) point values if gap interpolation (fill void pixels) is True
     if interpolate_gap_pixels:
         logging.info(" * Creating gridded raster with interpolated values for empty pixels from neighbouring pixels ...")
         logging.info("   -- Note: to deactivate pixel value interpolation option use interpolate_gap_pixels=False")
+        if grid_points(in_shp_file_name, out_raster_file_name, grid_geo_transform, x_res, y_res, srs.ExportToWkt(),
+                       algorithm=kwargs.get("algorithm", "invdist"), field_name=(field_names or [None])[0],
+                       no_data_value=no_data_value, rdtype=rdtype, tile_size=tile_size or 1024, workers=workers,
+                       cog=cog, overviews=overviews, resampling=resampling, **default_keys) < 0:
+            return None
+        return read_vsimem_output(out_raster_file_name) if output == "array" else 0
 
-        try:
-            algorithm = "invdist:power={0}:radius1={1}:radius2={2}:smoothing={3}:min_points={4}:max_points={5}".format(
-                str(default_keys["power"]), str(default_keys["radius1"]), str(default_keys["radius2"]),
-                str(default_keys["smoothing"]), str(default_keys["min_points"]), str(default_keys["max_points"])
-            )
-
-            gdal.Grid(out_raster_file_name, in_shp_file_name,
-                      algorithm=algorithm,
-                      zfield=kwargs.get("field_name"),
-                      outputType=rdtype,
-                      outputSRS=srs,
-                      width=x_res,
-                      height=y_res,
-                      outputBounds=[x_min, y_min, x_max, y_max])
-            return 0
-
-        except KeyError:
-            logging.error("! Invalid gdal.Grid options provided.")
+    # burn windows of large extents (in parallel) into a tiled raster
+    if workers != 1 and not tile_size:
+        tile_size = 1024
+    if tile_size:
+        if rasterize_tiles(in_shp_file_name, out_raster_file_name, geo_transform, x_res, y_res, srs.ExportToWkt(),
+                           rdtype=rdtype, no_data_value=no_data_value, field_names=field_names, tile_size=tile_size,
+                           workers=workers, cog=cog, overviews=overviews, resampling=resampling) < 0:
             return None
-        except RuntimeError as err:
-            logging.error("! %s." % str(err))
+        return read_vsimem_output(out_raster_file_name) if output == "array" else 0
 
     # create destination data source (GeoTIff raster)
+    bands = max(len(field_names), 1)
     try:
-        target_ds = gdal.GetDriverByName('GTiff').Create(out_raster_file_name, x_res, y_res, 1, eType=rdtype)
+        if cog or output == "array":
+            # COGs are assembled in memory and copied to the GeoTIFF afterwards
+            target_ds = gdal.GetDriverByName('MEM').Create("", x_res, y_res, bands, eType=rdtype)
+        else:
+            release_dataset(out_raster_file_name)
+            target_ds = gdal.GetDriverByName('GTiff').Create(out_raster_file_name, x_res, y_res, bands, eType=rdtype)
     except RuntimeError as err:
         logging.error("! Could not create %s." % str(out_raster_file_name))
         return None
-    target_ds.SetGeoTransform((x_min, pixel_size, 0, y_max, 0, -pixel_size))
-    band = target_ds.GetRasterBand(1)
-    band.Fill(no_data_value)
-    band.SetNoDataValue(no_data_value)
+    target_ds.SetGeoTransform(geo_transform)
+    for band_number in range(1, bands + 1):
+        band = target_ds.GetRasterBand(band_number)
+        band.Fill(no_data_value)
+        band.SetNoDataValue(no_data_value)
 
     # assign spatial reference
     target_ds.SetProjection(srs.ExportToWkt())
 
+    try:
+        burn_layer(target_ds, source_lyr, field_names, no_data_value)
+    except RuntimeError as err:
+        logging.error("! Could not rasterize (burn values from %s)." % str(in_shp_file_name))
+        return None
+
+    if output == "array":
+        array = target_ds.ReadAsArray().astype(np.float64)
+        array[array == no_data_value] = np.nan
+        return array, geo_transform, srs
+
+    # release raster bands
+    target_ds.FlushCache()
+    if finalize_raster(target_ds, out_raster_file_name, cog=cog, overviews=overviews, resampling=resampling) < 0:
+        return None
+    return 0
+
+
+def burn_layer(target_ds, layer, field_names=None, no_data_value=-9999):
+    """Burns the features of a layer into the bands of a raster with a single ``gdal.RasterizeLayer`` pass, where
+    every band receives the values of one field. This function is called by ``rasterize``.
+
+    Args:
+        target_ds (osgeo.gdal.Dataset): The target raster with one band per field (bands are pre-filled with ``no_data_value``).
+        layer (osgeo.ogr.Layer): The layer (with an optional spatial filter) to burn.
+        field_names (list): Field names to burn into the bands (default: ``None`` burns ``0`` into band ``1``).
+        no_data_value (int OR float): Numeric value for no-data pixels and ``NULL`` fields (default: ``-9999``).
+    """
+    field_names = field_names or []
     # RasterizeLayer(Dataset dataset, int bands, Layer layer, pfnTransformer=None, pTransformArg=None,
     # int burn_values=0, options=None, GDALProgressFunc callback=0, callback_data=None)
+    if len(field_names) <= 1:
+        options = ["ALL_TOUCHED=TRUE"] + ["ATTRIBUTE=" + str(field) for field in field_names]
+        gdal.RasterizeLayer(target_ds, [1], layer, None, None, burn_values=[0], options=options)
+        return
+
+    # burn feature numbers once and look up the field values of every band
+    id_layer = ogr.GetDriverByName("Memory").CreateDataSource("").CreateLayer(
+        "burn_ids", srs=layer.GetSpatialRef(), geom_type=layer.GetGeomType())
+    id_layer.CreateField(ogr.FieldDefn("burn_id", ogr.OFTInteger))
+    field_values = [[no_data_value] for field in field_names]
+    layer.ResetReading()
+    for burn_id, feature in enumerate(layer, start=1):
+        id_feature = ogr.Feature(id_layer.GetLayerDefn())
+        id_feature.SetGeometry(feature.GetGeometryRef())
+        id_feature.SetField(0, burn_id)
+        id_layer.CreateFeature(id_feature)
+        for values, field in zip(field_values, field_names):
+            value = feature.GetField(field)
+            values.append(no_data_value if value is None else value)
+    id_ds = gdal.GetDriverByName("MEM").Create("", target_ds.RasterXSize, target_ds.RasterYSize, 1, gdal.GDT_Int32)
+    id_ds.SetGeoTransform(target_ds.GetGeoTransform())
+    id_ds.SetProjection(target_ds.GetProjection())
+    gdal.RasterizeLayer(id_ds, [1], id_layer, None, None, burn_values=[0],
+                        options=["ALL_TOUCHED=TRUE", "ATTRIBUTE=burn_id"])
+    burn_ids = id_ds.ReadAsArray()
+    for band_number, values in enumerate(field_values, start=1):
+        target_ds.GetRasterBand(band_number).WriteArray(np.asarray(values, dtype=np.float64)[burn_ids])
+
+
+def read_vsimem_output(file_name):
+    """Reads and deletes an in-memory (``/vsimem/``) raster. This function is called by ``rasterize`` with
+    ``output="array"``.
+
+    Args:
+        file_name (str): The ``/vsimem/`` raster file name.
+
+    Returns:
+        tuple: ``(array, geo_transform, srs)``, where no-data pixels are ``np.nan``.
+    """
+    raster = gdal.Open(file_name)
+    bands = list(range(1, raster.RasterCount + 1))
+    array = read_bands(raster, bands).astype(np.float64)
+    for band_number in bands:
+        nodata = raster.GetRasterBand(band_number).GetNoDataValue()
+        if nodata is not None:
+            array[band_number - 1][array[band_number - 1] == nodata] = np.nan
+    geo_transform = raster.GetGeoTransform()
+    srs = osr.SpatialReference()
+    srs.ImportFromWkt(raster.GetProjection())
+    raster = None
+    release_dataset(file_name)
+    gdal.Unlink(file_name)
+    return (array[0] if len(bands) == 1 else array), geo_transform, srs
+
+
+def rasterize_tiles(in_shp_file_name, out_raster_file_name, geo_transform, cols, rows, projection,
+                    rdtype=gdal.GDT_Float32, no_data_value=-9999, field_names=None, tile_size=1024, workers=1,
+                    cog=False, overviews=None, resampling="average"):
+    """Burns the features of a shapefile window by window into a tiled, compressed GeoTIFF, where every window only
+    rasterizes the features that intersect with the window (spatial filter). This function is called by ``rasterize``.
+
+    Args:
+        in_shp_file_name (str): A shapefile name (with directory e.g., ``"C:/temp/poly.shp"``).
+        out_raster_file_name (str): Target file name, including directory; must end on ``".tif"``.
+        geo_transform (tuple): The GeoTransformation of the output raster.
+        cols (int): Number of output raster columns.
+        rows (int): Number of output raster rows.
+        projection (str): WKT-formatted projection of the output raster.
+        rdtype (gdal.GDALDataType): The raster data type (default: ``gdal.GDT_Float32``).
+        no_data_value (int OR float): Numeric value for no-data pixels (default: ``-9999``).
+        field_names (list): Names of the shapefile's fields with values to burn into one band each (default:
+                            ``None`` burns ``0`` into one band).
+        tile_size (int): Window (and GeoTIFF tile) size in pixels (default: ``1024``).
+        workers (int): Number of worker processes (default: ``1``).
+        cog (bool): Write a Cloud-Optimized GeoTIFF (default: ``False``).
+        overviews (list): Overview levels as decimation factors (default: ``None``).
+        resampling (str): Resampling method for overviews (default: ``"average"``).
+
+    Returns:
+        int: ``0`` if successful, otherwise ``-1``.
+    """
+    tile_file_name = get_tile_file_name(out_raster_file_name, cog=cog)
+    release_dataset(out_raster_file_name)
+    windows = iter_windows(cols, rows, tile_size, tile_size)
+    tasks = ((in_shp_file_name, window, geo_transform, projection, rdtype, no_data_value, field_names)
+             for window in windows)
+    with RasterWriter(tile_file_name, cols, rows, bands=max(len(field_names or []), 1), geo_info=geo_transform,
+                      projection=projection, nan_val=no_data_value, rdtype=rdtype, block_size=tile_size) as writer:
+        if not writer.dataset:
+            return -1
+        for window, tile in map_bounded(rasterize_tile, tasks, workers=workers):
+            if writer.write(tile, x_off=window[0], y_off=window[1]) < 0:
+                return -1
+
+    return finalize_tiled_raster(out_raster_file_name, cog=cog, overviews=overviews, resampling=resampling)
+
+
+def rasterize_tile(task):
+    """Burns the features that intersect with one window into an in-memory raster (worker function of
+    ``rasterize_tiles``).
+
+    Args:
+        task (tuple): ``(in_shp_file_name, window, geo_transform, projection, rdtype, no_data_value, field_names)``.
+
+    Returns:
+        tuple: ``(window, array)``, where ``array`` has the shape ``(bands, rows, cols)``.
+    """
+    in_shp_file_name, window, geo_transform, projection, rdtype, no_data_value, field_names = task
+    window_geo_transform = get_window_geo_transform(geo_transform, window[0], window[1])
+    # keep a reference to the data source, which owns the layer (the cache may close its handle meanwhile)
+    source_ds = open_dataset(in_shp_file_name, vector=True)
+    source_lyr = source_ds.GetLayer()
+
+    # limit the rasterized features to the window extent (plus half a pixel for ALL_TOUCHED)
+    source_lyr.SetSpatialFilter(get_window_polygon(window_geo_transform, window, projection,
+                                                   source_lyr.GetSpatialRef(), margin=0.5))
+    bands = max(len(field_names or []), 1)
+    target_ds = gdal.GetDriverByName("MEM").Create("", window[2], window[3], bands, eType=rdtype)
+    target_ds.SetGeoTransform(window_geo_transform)
+    target_ds.SetProjection(projection)
+    for band_number in range(1, bands + 1):
+        target_ds.GetRasterBand(band_number).Fill(no_data_value)
     try:
-        if kwargs.get("field_name"):
-            gdal.RasterizeLayer(target_ds, [1], source_lyr, None, None, burn_values=[0],
-                                options=["ALL_TOUCHED=TRUE", "ATTRIBUTE=" + str(kwargs.get("field_name"))])
+        burn_layer(target_ds, source_lyr, field_names, no_data_value)
+    finally:
+        source_lyr.SetSpatialFilter(None)
+    return window, target_ds.ReadAsArray().reshape((bands, window[3], window[2]))
+
+
+def get_window_polygon(window_geo_transform, window, projection=None, layer_srs=None, margin=0.):
+    """Gets the outline of a raster window as polygon in the coordinates of a layer, for example, to limit the
+    features of the layer that are burnt into the window (spatial filter).
+
+    Args:
+        window_geo_transform (tuple): The GeoTransformation of the window (see ``get_window_geo_transform``).
+        window (tuple): Window ``(x_off, y_off, x_size, y_size)`` in pixels.
+        projection (str): WKT-formatted projection of the raster (default: ``None``).
+        layer_srs (osr.SpatialReference): Spatial reference of the layer (default: ``None``). The polygon is
+            transformed to ``layer_srs`` if both ``projection`` and ``layer_srs`` are defined and differ.
+        margin (float): Margin around the window in pixels (default: ``0.``).
+
+    Returns:
+        osgeo.ogr.Geometry: The window polygon.
+    """
+    ring = ogr.Geometry(ogr.wkbLinearRing)
+    for x_pixel, y_pixel in ((-margin, -margin), (window[2] + margin, -margin),
+                             (window[2] + margin, window[3] + margin), (-margin, window[3] + margin),
+                             (-margin, -margin)):
+        ring.AddPoint_2D(*gdal.ApplyGeoTransform(window_geo_transform, x_pixel, y_pixel))
+    window_polygon = ogr.Geometry(ogr.wkbPolygon)
+    window_polygon.AddGeometry(ring)
+    if projection and layer_srs is not None:
+        # spatial filters apply to layer coordinates, while the window is in raster coordinates
+        raster_srs = osr.SpatialReference(wkt=projection)
+        if not raster_srs.IsSame(layer_srs):
+            # densify the edges, which may be curved in the layer SRS
+            pixel_size = np.hypot(window_geo_transform[1], window_geo_transform[2])
+            window_polygon.Segmentize(max(window[2], window[3]) * pixel_size / 16.)
+            window_polygon.Transform(get_coordinate_transformation(raster_srs, layer_srs))
+    return window_polygon
+
+
+def zonal_stats(polygon_shp, raster_file_name, stats=("count", "sum", "mean", "min", "max"), field=None, band_number=1,
+                tile_size=1024, workers=1, write_fields=False):
+    """Computes statistics of raster pixel values within every polygon (zone) of a shapefile. The zone IDs are burnt
+    tile by tile into in-memory rasters aligned to the source raster (with ``gdal.RasterizeLayer``), and the
+    statistics are reduced per tile with grouped ``np.bincount`` operations and merged with the parallel variant of
+    Welford's algorithm (see ``merge_moments``), which also works with rasters that do not fit in memory.
+
+    Args:
+        polygon_shp (str): A polygon shapefile name, including directory; must end on ``".shp"``.
+        raster_file_name (str): Raster file name, including directory (e.g., a GeoTIFF or a VRT from ``build_mosaic``).
+        stats (list): Statistics to compute. Valid options are ``"count"``, ``"sum"``, ``"mean"``, ``"min"``, ``"max"``,
+                      ``"std"``, ``"median"``, and ``"percentile_Q"`` (e.g., ``"percentile_90"``), where the median and
+                      percentiles keep all zone pixel values in memory (default: ``("count", "sum", "mean", "min", "max")``).
+        field (str): Name of the shapefile field that identifies the zones (default: ``None`` uses feature IDs).
+        band_number (int): The raster band number to use (default: ``1``).
+        tile_size (int): Tile size in pixels (default: ``1024``).
+        workers (int): Number of worker processes (default: ``1``; ``None`` uses all CPU cores).
+        write_fields (bool): Add the statistics as fields to the attribute table of ``polygon_shp`` (default: ``False``).
+
+    Returns:
+        pandas.DataFrame: Statistics (columns) of every zone (index). Pixels with no-data values are ignored and
+        pixel centers define whether a pixel belongs to a zone. Every pixel belongs to one zone only: where polygons
+        overlap, the pixels are assigned to the polygon with the highest feature ID (the last one burnt), and
+        ``"std"`` is the population standard deviation.
+    """
+    raster, band = open_raster(raster_file_name, band_number=band_number)
+    source_ds = open_dataset(polygon_shp, vector=True)
+    try:
+        cols, rows = raster.RasterXSize, raster.RasterYSize
+        layer = source_ds.GetLayer()
+    except AttributeError:
+        logging.error("Could not open %s or %s." % (str(raster_file_name), str(polygon_shp)))
+        return None
+    layer.ResetReading()
+    zone_ids = [feature.GetField(field) if field else feature.GetFID() for feature in layer]
+    n_zones = len(zone_ids) + 1
+    keep_values = any(stat == "median" or stat.startswith("percentile_") for stat in stats)
+
+    # per-zone moments (count, mean, m2, min, max), where m2 is the sum of squared deviations from the mean
+    moments = (np.zeros(n_zones, dtype=np.int64), np.zeros(n_zones), np.zeros(n_zones),
+               np.full(n_zones, np.inf), np.full(n_zones, -np.inf))
+    zone_values = [[] for _ in range(n_zones)]
+    tasks = ((polygon_shp, raster_file_name, band_number, window, keep_values)
+             for window in iter_windows(cols, rows, tile_size, tile_size))
+    for tile in map_bounded(zonal_tile_stats, tasks, workers=workers):
+        if tile is None:
+            continue
+        zones, tile_moments, tile_values = tile
+        merged = merge_moments(tuple(moment[zones] for moment in moments), tile_moments)
+        for moment, merged_moment in zip(moments, merged):
+            moment[zones] = merged_moment
+        for zone, values in zip(zones, tile_values or []):
+            zone_values[zone].append(values)
+
+    # skip the zone index 0 (pixels outside of polygons)
+    count, mean, m2, minimum, maximum = moments
+    with np.errstate(invalid="ignore", divide="ignore"):
+        results = {"count": count, "sum": mean * count, "mean": np.where(count > 0, mean, np.nan),
+                   "min": np.where(count > 0, minimum, np.nan), "max": np.where(count > 0, maximum, np.nan),
+                   "std": np.where(count > 0, np.sqrt(m2 / count), np.nan)}
+    columns = {}
+    for stat in stats:
+        if stat in results:
+            columns[stat] = results[stat][1:]
+        elif stat == "median" or stat.startswith("percentile_"):
+            q = 50. if stat == "median" else float(stat.split("_")[-1])
+            columns[stat] = [np.percentile(np.concatenate(values), q) if values else np.nan
+                             for values in zone_values[1:]]
         else:
-            gdal.RasterizeLayer(target_ds, [1], source_lyr, None, None, burn_values=[0],
-                                options=["ALL_TOUCHED=TRUE"])
-    except RuntimeError as err:
-        logging.error("! Could not rasterize (burn values from %s)." % str(in_shp_file_name))
+            logging.error("Unknown statistic %s." % str(stat))
+    df = pd.DataFrame(columns, index=pd.Index(zone_ids, name=field or "FID"))
+
+    if write_fields:
+        write_zonal_fields(polygon_shp, df)
+    return df
+
+
+def zonal_tile_stats(task):
+    """Burns zone IDs into a tile aligned to the raster and reduces the tile pixel values per zone. This function is
+    called by ``zonal_stats`` (in worker processes).
+
+    Args:
+        task (tuple): ``(polygon_shp, raster_file_name, band_number, window, keep_values)``.
+
+    Returns:
+        tuple: ``(zones, (count, mean, m2, min, max), values)`` of all zones in the tile, where ``m2`` is the sum of
+        squared deviations from the mean and ``values`` is a list of pixel value arrays per zone (``None`` if
+        ``keep_values`` is ``False``). Returns ``None`` if the tile does not contain any zone.
+    """
+    polygon_shp, raster_file_name, band_number, window, keep_values = task
+    raster, band = open_raster(raster_file_name, band_number=band_number)
+    window_geo_transform = get_window_geo_transform(raster.GetGeoTransform(), window[0], window[1])
+    zone_layer = get_zone_layer(polygon_shp)
+
+    # limit the rasterized features to the tile extent (gdal reprojects zones in another SRS to the raster SRS)
+    zone_layer.SetSpatialFilter(get_window_polygon(window_geo_transform, window, raster.GetProjection(),
+                                                   zone_layer.GetSpatialRef()))
+    zone_ds = gdal.GetDriverByName("MEM").Create("", window[2], window[3], 1, gdal.GDT_Int32)
+    zone_ds.SetGeoTransform(window_geo_transform)
+    zone_ds.SetProjection(raster.GetProjection())
+    gdal.RasterizeLayer(zone_ds, [1], zone_layer, options=["ATTRIBUTE=zone"])
+    zone_layer.SetSpatialFilter(None)
+
+    zones = zone_ds.ReadAsArray().ravel()
+    values = read_raster_window(band, window, nodata=band.GetNoDataValue())[0].ravel().astype(np.float64)
+    valid = (zones > 0) & np.isfinite(values)
+    if not valid.any():
         return None
+    zones = zones[valid]
+    values = values[valid]
+
+    # grouped reductions with the zone IDs as bins
+    tile_zones, inverse = np.unique(zones, return_inverse=True)
+    tile_count = np.bincount(inverse)
+    tile_mean = np.bincount(inverse, weights=values) / tile_count
+    tile_m2 = np.bincount(inverse, weights=(values - tile_mean[inverse]) ** 2)
+    order = np.argsort(inverse, kind="stable")
+    starts = np.concatenate(([0], np.cumsum(tile_count)[:-1]))
+    tile_min = np.minimum.reduceat(values[order], starts)
+    tile_max = np.maximum.reduceat(values[order], starts)
+    tile_values = np.split(values[order], starts[1:]) if keep_values else None
+    return tile_zones, (tile_count, tile_mean, tile_m2, tile_min, tile_max), tile_values
+
+
+zone_layers = {}
+
+
+def get_zone_layer(polygon_shp):
+    """Gets an in-memory copy of a polygon shapefile layer with a ``zone`` field that numbers the features
+    (starting at ``1``) in the order of their feature IDs. The copy is created once per process.
+
+    Args:
+        polygon_shp (str): A polygon shapefile name, including directory; must end on ``".shp"``.
+
+    Returns:
+        osgeo.ogr.Layer: The in-memory zone layer.
+    """
+    key = (os.path.abspath(polygon_shp), str(DatasetCache.get_signature(polygon_shp)), os.getpid())
+    if key not in zone_layers:
+        source_ds = open_dataset(polygon_shp, vector=True)
+        source_lyr = source_ds.GetLayer()
+        zone_ds = ogr.GetDriverByName("Memory").CreateDataSource("")
+        zone_lyr = zone_ds.CreateLayer("zones", srs=source_lyr.GetSpatialRef(), geom_type=source_lyr.GetGeomType())
+        zone_lyr.CreateField(ogr.FieldDefn("zone", ogr.OFTInteger))
+        source_lyr.ResetReading()
+        for zone, feature in enumerate(source_lyr, start=1):
+            zone_feature = ogr.Feature(zone_lyr.GetLayerDefn())
+            zone_feature.SetGeometry(feature.GetGeometryRef())
+            zone_feature.SetField("zone", zone)
+            zone_lyr.CreateFeature(zone_feature)
+        # keep a reference to the data source, which owns the layer
+        zone_layers.clear()
+        zone_layers[key] = (zone_ds, zone_lyr)
+    return zone_layers[key][1]
+
+
+def write_zonal_fields(polygon_shp, df):
+    """Writes the columns of a zonal statistics data frame as fields into a shapefile. This function is called by ``zonal_stats``.
+
+    Args:
+        polygon_shp (str): A polygon shapefile name, including directory; must end on ``".shp"``.
+        df (pandas.DataFrame): Zonal statistics with one row per feature (in the order of the feature IDs).
+    """
+    field_names = [str(column).replace("percentile_", "p") for column in df.columns]
+    write_float_fields(polygon_shp, field_names, df.to_numpy(dtype=np.float64))
+    logging.info(" * wrote zonal statistics to %s" % str(polygon_shp))
+
+
+def write_float_fields(shp_file_name, field_names, values):
+    """Writes columns of values as real-number fields into a shapefile in one transaction. Existing fields with the
+    same names are overwritten. This function is called by ``write_zonal_fields`` and ``sample_raster``.
+
+    Args:
+        shp_file_name (str): Shapefile name, including directory; must end on ``".shp"``.
+        field_names (list): Field names, which are truncated to 10 characters (shapefile limit) and made unique by
+                            replacing the last characters of duplicates with a number (e.g., ``"elevation1"``).
+        values (ndarray): Values with the shape ``(features, fields)`` in the order of the feature IDs, where
+                          non-finite values (e.g., ``np.nan``) are not written.
+    """
+    release_dataset(shp_file_name)
+    shp_ds = ogr.Open(shp_file_name, 1)
+    layer = shp_ds.GetLayer()
+    field_names = get_unique_field_names(field_names)
+    for field_name in field_names:
+        if layer.FindFieldIndex(field_name, 1) < 0:
+            layer.CreateField(ogr.FieldDefn(field_name, ogr.OFTReal))
+    layer.ResetReading()
+    layer.StartTransaction()
+    for feature, feature_values in zip(layer, values):
+        for field_name, value in zip(field_names, feature_values):
+            if np.isfinite(value):
+                feature.SetField(field_name, float(value))
+        layer.SetFeature(feature)
+    layer.CommitTransaction()
+    shp_ds = None
+
+
+def get_unique_field_names(field_names, max_length=10):
+    """Truncates field names to a maximum length and makes them unique, where the last characters of duplicate
+    names are replaced with a counter.
+
+    Args:
+        field_names (list): Field names.
+        max_length (int): Maximum length of the field names (default: ``10`` for shapefiles).
+
+    Returns:
+        list: Unique field names with a maximum of ``max_length`` characters.
+    """
+    unique_names = []
+    for field_name in field_names:
+        unique_name = str(field_name)[0:max_length]
+        counter = 1
+        while unique_name in unique_names:
+            unique_name = str(field_name)[0:max_length - len(str(counter))] + str(counter)
+            counter += 1
+        unique_names.append(unique_name)
+    return unique_names
+
+
+def sample_raster(raster_file_name, xs, ys=None, bands=1, method="nearest", field_prefix=None):
+    """Samples raster values at many points. The points are grouped by raster block so that every block that contains
+    points is read only once.
+
+    Args:
+        raster_file_name (str): Raster file name, including directory (e.g., a GeoTIFF or a VRT from ``build_mosaic``).
+        xs (``ndarray`` or ``str``): x-coordinates of the points in the raster SRS, or the name of a point shapefile
+                                     (including directory), whose points are transformed to the raster SRS.
+        ys (ndarray): y-coordinates of the points (ignored if ``xs`` is a shapefile).
+        bands (``int`` or ``list``): Band number or list of band numbers to sample (default: ``1``).
+        method (str): Either ``"nearest"`` (default) or ``"bilinear"`` (interpolation between pixel centers).
+        field_prefix (str): If ``xs`` is a point shapefile, write the sampled values to new fields named
+                            ``field_prefix + BAND-NUMBER`` (truncated to unique names with 10 characters; default:
+                            ``None`` does not modify the shapefile).
+
+    Returns:
+        ndarray: Sampled values with the shape ``(points,)`` for a single band, or ``(points, bands)`` for a list of
+        bands, where points outside the raster, on no-data pixels, or shapefile features without geometry are ``np.nan``.
+    """
+    point_shp = xs if isinstance(xs, str) else None
+    point_srs = None
+    if point_shp:
+        point_ds = open_dataset(point_shp, vector=True)
+        layer = point_ds.GetLayer()
+        point_srs = layer.GetSpatialRef().Clone() if layer.GetSpatialRef() else None
+        layer.ResetReading()
+        # features without geometry get nan coordinates, which keeps the values in the order of the features
+        coords = np.array([feature.GetGeometryRef().GetPoint_2D(0) if feature.GetGeometryRef() else (np.nan, np.nan)
+                           for feature in layer], dtype=np.float64).reshape((-1, 2))
+        if np.isnan(coords[:, 0]).any():
+            logging.warning("%s has %i features without geometry (sampled as nan)." % (str(point_shp),
+                                                                                      int(np.isnan(coords[:, 0]).sum())))
+        xs, ys = coords[:, 0], coords[:, 1]
+    xs = np.asarray(xs, dtype=np.float64).ravel()
+    ys = np.asarray(ys, dtype=np.float64).ravel()
+
+    raster, band = open_raster(raster_file_name)
+    try:
+        cols, rows = raster.RasterXSize, raster.RasterYSize
+        block_x, block_y = band.GetBlockSize()
+    except AttributeError:
+        logging.error("Could not open %s." % str(raster_file_name))
+        return None
+    band_numbers = [bands] if isinstance(bands, int) else read_band_numbers(raster, bands)
+    if point_srs is not None and raster.GetProjection():
+        raster_srs = osr.SpatialReference(wkt=raster.GetProjection())
+        if not raster_srs.IsSame(point_srs):
+            xs, ys = transform_coords(xs, ys, point_srs, raster_srs)
+
+    # convert coordinates to (fractional) pixel offsets
+    px, py, inside = coords2offsets(raster.GetGeoTransform(), xs, ys, rounding=None, shape=(rows, cols))
+    if method == "bilinear":
+        # interpolate between the four surrounding pixel centers (clamped at the raster edges)
+        fx = np.clip(px - 0.5, 0, cols - 1)
+        fy = np.clip(py - 0.5, 0, rows - 1)
+        col = np.minimum(np.floor(fx), max(cols - 2, 0)).astype(np.int64)
+        row = np.minimum(np.floor(fy), max(rows - 2, 0)).astype(np.int64)
+        wx = fx - col
+        wy = fy - row
+    else:
+        col = np.clip(np.floor(px), 0, cols - 1).astype(np.int64)
+        row = np.clip(np.floor(py), 0, rows - 1).astype(np.int64)
+
+    values = np.full((xs.size, len(band_numbers)), np.nan)
+    blocks = (row // block_y) * int(np.ceil(cols / block_x)) + col // block_x
+    blocks[~inside] = -1
+    order = np.argsort(blocks, kind="stable")
+    block_ids, starts = np.unique(blocks[order], return_index=True)
+    for block_id, points in zip(block_ids, np.split(order, starts[1:])):
+        if block_id < 0:
+            continue
+        x_off = int(block_id % int(np.ceil(cols / block_x))) * block_x
+        y_off = int(block_id // int(np.ceil(cols / block_x))) * block_y
+        extra = 1 if method == "bilinear" else 0
+        window = (x_off, y_off, min(block_x + extra, cols - x_off), min(block_y + extra, rows - y_off))
+        c = col[points] - x_off
+        r = row[points] - y_off
+        for i, band_number in enumerate(band_numbers):
+            sample_band = raster.GetRasterBand(band_number)
+            array = read_raster_window(sample_band, window, nodata=sample_band.GetNoDataValue())[0]
+            if method == "bilinear":
+                c1 = np.minimum(c + 1, array.shape[1] - 1)
+                r1 = np.minimum(r + 1, array.shape[0] - 1)
+                values[points, i] = (array[r, c] * (1 - wx[points]) * (1 - wy[points]) +
+                                     array[r, c1] * wx[points] * (1 - wy[points]) +
+                                     array[r1, c] * (1 - wx[points]) * wy[points] +
+                                     array[r1, c1] * wx[points] * wy[points])
+            else:
+                values[points, i] = array[r, c]
 
-    # release raster band
-    band.FlushCache()
+    if point_shp and field_prefix:
+        write_float_fields(point_shp, [str(field_prefix) + str(band_number) for band_number in band_numbers], values)
 
+    if isinstance(bands, int):
+        return values[:, 0]
+    return values
@@ -7,6 +7,10 @@ try:
     import subprocess
     import itertools
     import shutil
+    import concurrent.futures
+    import functools
+    import hashlib
+    import tempfile
 except ImportError as e:
     raise ImportError("Could not import standard libraries:\n{0}".format(e))
 
@@ -60,6 +64,7 @@ except ImportError as e:
 # Global variables
 cache_folder = os.path.abspath("") + "/__cache__/"
 nan_value = -9999.0
+max_open_datasets = 64
 
 gdal_dtype_dict = {
     0: "gdal.GDT_Unknown",
@@ -76,6 +81,18 @@ gdal_dtype_dict = {
     11: "gdal.GDT_CFloat64",
 }
 
+gdal_numpy_dtype_dict = {
+    1: np.uint8,
+    2: np.uint16,
+    3: np.int16,
+    4: np.uint32,
+    5: np.int32,
+    6: np.float32,
+    7: np.float64,
+    10: np.complex64,
+    11: np.complex128,
+}
+
 
 def cache(fun):
     """Makes a function running in a temoprary ``__cache__`` sub-folder to enable deleting temporary trash files."""
@@ -0,0 +1,317 @@
+"""Gridding of scattered points (e.g., survey or LAS-derived point shapefiles) to rasters with inverse distance
+weighting based on a KD-tree or with per-pixel binning. The grid is computed tile by tile (optionally in parallel) and
+written through ``RasterWriter``."""
+from .srs_mgmt import *
+
+try:
+    # optional: only the invdist algorithm requires the KD-tree of scipy
+    from scipy.spatial import cKDTree
+except ImportError:
+    cKDTree = None
+
+
+binned_algorithms = ("mean", "min", "max", "count")
+point_clouds = {}
+
+
+def grid_points(in_shp_file_name, out_raster_file_name, geo_transform, cols, rows, projection, algorithm="invdist",
+                field_name=None, no_data_value=-9999, rdtype=gdal.GDT_Float32, tile_size=1024, workers=1, cog=False,
+                overviews=None, resampling="average", **kwargs):
+    """Interpolates or bins the values of a point shapefile to a raster.
+
+    Args:
+        in_shp_file_name (str): A point shapefile name (with directory e.g., ``"C:/temp/points.shp"``).
+        out_raster_file_name (str): Target file name, including directory; must end on ``".tif"``.
+        geo_transform (tuple): The GeoTransformation of the output raster.
+        cols (int): Number of output raster columns.
+        rows (int): Number of output raster rows.
+        projection (str): WKT-formatted projection of the output raster. Points in another spatial reference system
+                          are transformed to ``projection``.
+        algorithm (str): Either ``"invdist"`` (inverse distance weighting, default), or ``"mean"``, ``"min"``,
+                         ``"max"``, or ``"count"`` of the points in every pixel.
+        field_name (str): Name of the field with the point values (default: ``None`` uses the point z-coordinates).
+        no_data_value (int OR float): Numeric value for empty pixels (default: ``-9999``).
+        rdtype (gdal.GDALDataType): The raster data type (default: ``gdal.GDT_Float32``).
+        tile_size (int): Tile size in pixels (default: ``1024``).
+        workers (int): Number of worker processes (default: ``1``; ``None`` uses all CPU cores).
+        cog (bool): Write a Cloud-Optimized GeoTIFF (default: ``False``).
+        overviews (list): Overview levels as decimation factors (default: ``None``).
+        resampling (str): Resampling method for overviews (default: ``"average"``).
+
+    Keyword Args:
+        power (float): Weighting power (default: ``1.0``).
+        smoothing (float): Smoothing parameter (default: ``0.0``).
+        radius1 (float): The x-radius of the search ellipse (default: ``-1`` corresponds to infinity).
+        radius2 (float): The y-radius of the search ellipse (default: ``-1`` corresponds to infinity).
+        min_points (int): Minimum number of points within the search ellipse; pixels with fewer points are empty (default: ``0``).
+        max_points (int): Maximum number of (nearest) points to use (default: ``0`` uses all points within the search ellipse).
+
+    Returns:
+        int: ``0`` if successful, otherwise ``-1``.
+
+    Hint:
+        The keyword arguments have the same meaning as for the ``invdist`` algorithm of ``gdal.Grid``. Defining
+        ``max_points`` (e.g., ``12``) or a search ellipse makes the interpolation run in (close to) linear time,
+        because every pixel only uses its neighbouring points from the KD-tree. The point data are loaded before the
+        worker processes start, such that forked workers share them.
+    """
+    if algorithm not in ("invdist",) + binned_algorithms:
+        logging.error("Invalid gridding algorithm (%s)." % str(algorithm))
+        return -1
+    if algorithm == "invdist" and cKDTree is None:
+        logging.error("The invdist algorithm requires scipy (is it installed?).")
+        return -1
+    idw_options = {"power": float(kwargs.get("power", 1.0)),
+                   "smoothing": float(kwargs.get("smoothing", 0.0)),
+                   "radius1": float(kwargs.get("radius1", -1)),
+                   "radius2": float(kwargs.get("radius2", -1)),
+                   "min_points": int(kwargs.get("min_points", 0)),
+                   "max_points": int(kwargs.get("max_points", 0))}
+
+    # load the points (and build the search tree) before forking the workers
+    try:
+        cloud = get_point_cloud(in_shp_file_name, field_name, projection=projection)
+    except (AttributeError, RuntimeError):
+        logging.error("! Could not read points from %s." % str(in_shp_file_name))
+        return -1
+    if algorithm == "invdist":
+        get_point_tree(cloud, idw_options["radius1"], idw_options["radius2"])
+    else:
+        get_point_tiles(cloud, geo_transform, cols, rows, tile_size)
+
+    tile_file_name = get_tile_file_name(out_raster_file_name, cog=cog)
+    release_dataset(out_raster_file_name)
+    windows = iter_windows(cols, rows, tile_size, tile_size)
+    tasks = ((in_shp_file_name, field_name, projection, window, geo_transform, cols, rows, tile_size, algorithm,
+              idw_options) for window in windows)
+    with RasterWriter(tile_file_name, cols, rows, geo_info=geo_transform, projection=projection,
+                      nan_val=no_data_value, rdtype=rdtype, block_size=tile_size) as writer:
+        if not writer.dataset:
+            return -1
+        for window, tile in map_bounded(grid_tile, tasks, workers=workers):
+            if writer.write(tile, x_off=window[0], y_off=window[1]) < 0:
+                return -1
+
+    return finalize_tiled_raster(out_raster_file_name, cog=cog, overviews=overviews, resampling=resampling)
+
+
+def grid_tile(task):
+    """Grids the points of one raster tile (worker function of ``grid_points``).
+
+    Args:
+        task (tuple): ``(in_shp_file_name, field_name, projection, window, geo_transform, cols, rows, tile_size,
+                      algorithm, idw_options)``.
+
+    Returns:
+        tuple: ``(window, array)``, where empty pixels are ``np.nan``.
+    """
+    in_shp_file_name, field_name, projection, window, geo_transform, cols, rows, tile_size, algorithm, idw_options = task
+    cloud = get_point_cloud(in_shp_file_name, field_name, projection=projection)
+    x_off, y_off, x_size, y_size = window
+    if algorithm in binned_algorithms:
+        order, tile_ids, offsets_x, offsets_y = get_point_tiles(cloud, geo_transform, cols, rows, tile_size)
+        tile_id = (y_off // tile_size) * int(np.ceil(cols / tile_size)) + x_off // tile_size
+        points = order[np.searchsorted(tile_ids, tile_id, side="left"):np.searchsorted(tile_ids, tile_id, side="right")]
+        pixels = (offsets_y[points] - y_off) * x_size + (offsets_x[points] - x_off)
+        array = bin_values(pixels, cloud["values"][points], x_size * y_size, algorithm)
+    else:
+        offset_x, offset_y = np.meshgrid(np.arange(x_off, x_off + x_size), np.arange(y_off, y_off + y_size))
+        pixel_x, pixel_y = offsets2coords(geo_transform, offset_x.ravel(), offset_y.ravel())
+        array = interpolate_idw(cloud, pixel_x, pixel_y, **idw_options)
+    return window, array.reshape((y_size, x_size))
+
+
+def get_point_cloud(in_shp_file_name, field_name=None, projection=None):
+    """Reads the coordinates and values of a point shapefile once per process (and file modification).
+
+    Args:
+        in_shp_file_name (str): A point shapefile name (with directory e.g., ``"C:/temp/points.shp"``).
+        field_name (str): Name of the field with the point values (default: ``None`` uses the point z-coordinates).
+        projection (str): WKT-formatted projection of the target raster, where the points are transformed to if the
+                          shapefile has another spatial reference system (default: ``None`` uses the raw coordinates).
+
+    Returns:
+        dict: ``{"x": ndarray, "y": ndarray, "values": ndarray}``, which also caches search trees and tile indices.
+    """
+    key = (DatasetCache.get_path(in_shp_file_name), DatasetCache.get_signature(in_shp_file_name), field_name,
+           projection)
+    try:
+        return point_clouds[key]
+    except KeyError:
+        pass
+    # keep a reference to the data source, which owns the layer
+    source_ds = open_dataset(in_shp_file_name, vector=True)
+    layer = source_ds.GetLayer()
+    layer.ResetReading()
+    coords = []
+    values = []
+    for feature in layer:
+        geometry = feature.GetGeometryRef()
+        parts = [geometry.GetGeometryRef(i) for i in range(geometry.GetGeometryCount())] or [geometry]
+        for part in parts:
+            x, y, z = part.GetPoint(0)
+            coords.append((x, y))
+            values.append(feature.GetField(field_name) if field_name else z)
+    coords = np.array(coords, dtype=np.float64).reshape((-1, 2))
+    values = np.array(values, dtype=np.float64)
+    layer_srs = layer.GetSpatialRef()
+    if projection and layer_srs is not None and coords.size:
+        raster_srs = osr.SpatialReference(wkt=projection)
+        if not raster_srs.IsSame(layer_srs):
+            coords = np.column_stack(transform_coords(coords[:, 0], coords[:, 1], layer_srs, raster_srs))
+    valid = np.isfinite(values)
+    point_clouds.clear()
+    point_clouds[key] = {"x": coords[valid, 0], "y": coords[valid, 1], "values": values[valid]}
+    return point_clouds[key]
+
+
+def get_point_tree(cloud, radius1=-1, radius2=-1):
+    """Gets the KD-tree of a point cloud, where the coordinates are scaled by the radii of the search ellipse.
+
+    Args:
+        cloud (dict): A point cloud from ``get_point_cloud``.
+        radius1 (float): The x-radius of the search ellipse (``<= 0`` corresponds to infinity).
+        radius2 (float): The y-radius of the search ellipse (``<= 0`` corresponds to infinity).
+
+    Returns:
+        tuple: ``(tree, scale_x, scale_y)``, where the ellipse corresponds to a unit circle in the scaled tree.
+    """
+    scale_x, scale_y = (1. / radius1, 1. / radius2) if radius1 > 0 and radius2 > 0 else (1., 1.)
+    key = ("tree", scale_x, scale_y)
+    if key not in cloud:
+        cloud[key] = cKDTree(np.column_stack((cloud["x"] * scale_x, cloud["y"] * scale_y)))
+    return cloud[key], scale_x, scale_y
+
+
+def get_point_tiles(cloud, geo_transform, cols, rows, tile_size):
+    """Gets the pixel offsets of a point cloud and the points sorted by raster tiles.
+
+    Args:
+        cloud (dict): A point cloud from ``get_point_cloud``.
+        geo_transform (tuple): The GeoTransformation of the raster.
+        cols (int): Number of raster columns.
+        rows (int): Number of raster rows.
+        tile_size (int): Tile size in pixels.
+
+    Returns:
+        tuple: ``(order, tile_ids, offset_x, offset_y)``, where ``order`` sorts the points by ``tile_ids`` (``-1`` for
+        points outside the raster).
+    """
+    key = ("tiles", tuple(geo_transform), cols, rows, tile_size)
+    if key not in cloud:
+        offset_x, offset_y, inside = coords2offsets(geo_transform, cloud["x"], cloud["y"], shape=(rows, cols))
+        tile_ids = (offset_y // tile_size) * int(np.ceil(cols / tile_size)) + offset_x // tile_size
+        tile_ids[~inside] = -1
+        order = np.argsort(tile_ids, kind="stable")
+        cloud[key] = (order, tile_ids[order], offset_x, offset_y)
+    return cloud[key]
+
+
+def bin_values(pixels, values, size, algorithm="mean"):
+    """Reduces point values per pixel with grouped ``numpy`` operations.
+
+    Args:
+        pixels (ndarray): Flat pixel indices of the points.
+        values (ndarray): Point values.
+        size (int): Number of pixels.
+        algorithm (str): Either ``"mean"``, ``"min"``, ``"max"``, or ``"count"`` (default: ``"mean"``).
+
+    Returns:
+        ndarray: The reduced values of all pixels (``np.nan`` for pixels without points).
+    """
+    count = np.bincount(pixels, minlength=size)
+    if algorithm == "count":
+        return count.astype(np.float64)
+    if algorithm == "mean":
+        result = np.bincount(pixels, weights=values, minlength=size) / np.maximum(count, 1)
+    else:
+        result = np.full(size, np.inf if algorithm == "min" else -np.inf)
+        (np.minimum if algorithm == "min" else np.maximum).at(result, pixels, values)
+    result[count == 0] = np.nan
+    return result
+
+
+def interpolate_idw(cloud, pixel_x, pixel_y, power=1.0, smoothing=0.0, radius1=-1, radius2=-1, min_points=0,
+                    max_points=0):
+    """Interpolates point values at pixel centers with inverse distance weighting (same parameters as the ``invdist``
+    algorithm of ``gdal.Grid``).
+
+    Args:
+        cloud (dict): A point cloud from ``get_point_cloud``.
+        pixel_x (ndarray): x-coordinates of the pixel centers.
+        pixel_y (ndarray): y-coordinates of the pixel centers.
+        power (float): Weighting power (default: ``1.0``).
+        smoothing (float): Smoothing parameter (default: ``0.0``).
+        radius1 (float): The x-radius of the search ellipse (default: ``-1`` corresponds to infinity).
+        radius2 (float): The y-radius of the search ellipse (default: ``-1`` corresponds to infinity).
+        min_points (int): Minimum number of points to use (default: ``0``).
+        max_points (int): Maximum number of (nearest) points to use (default: ``0`` means no limit).
+
+    Returns:
+        ndarray: Interpolated values (``np.nan`` for pixels with less than ``min_points`` points).
+    """
+    size = pixel_x.size
+    n_points = cloud["values"].size
+    if n_points == 0:
+        return np.full(size, np.nan)
+    tree, scale_x, scale_y = get_point_tree(cloud, radius1, radius2)
+    bounded = radius1 > 0 and radius2 > 0
+    if max_points > 0 or bounded:
+        scaled = np.column_stack((pixel_x * scale_x, pixel_y * scale_y))
+        if max_points > 0:
+            k = min(max_points, n_points)
+            distances, points = tree.query(scaled, k=k, distance_upper_bound=1. if bounded else np.inf)
+            pixels = np.repeat(np.arange(size), k)
+            points = points.reshape(-1)
+            valid = points < n_points
+            pixels, points = pixels[valid], points[valid]
+        else:
+            neighbours = tree.query_ball_point(scaled, r=1.)
+            lengths = np.fromiter((len(indices) for indices in neighbours), dtype=np.int64, count=size)
+            pixels = np.repeat(np.arange(size), lengths)
+            points = np.fromiter(itertools.chain.from_iterable(neighbours), dtype=np.int64, count=lengths.sum())
+        return weight_pairs(cloud, pixel_x, pixel_y, pixels, points, size, power, smoothing, min_points)
+
+    # all points contribute to every pixel: process chunks of pixels to limit the memory usage
+    result = np.empty(size)
+    chunk = max(1, 2 ** 22 // n_points)
+    for start in range(0, size, chunk):
+        end = min(start + chunk, size)
+        pixels = np.repeat(np.arange(end - start), n_points)
+        points = np.tile(np.arange(n_points), end - start)
+        result[start:end] = weight_pairs(cloud, pixel_x[start:end], pixel_y[start:end], pixels, points, end - start,
+                                         power, smoothing, min_points)
+    return result
+
+
+def weight_pairs(cloud, pixel_x, pixel_y, pixels, points, size, power=1.0, smoothing=0.0, min_points=0):
+    """Computes inverse distance weighted values from pairs of pixels and points. This function is called by
+    ``interpolate_idw``.
+
+    Args:
+        cloud (dict): A point cloud from ``get_point_cloud``.
+        pixel_x (ndarray): x-coordinates of the pixel centers.
+        pixel_y (ndarray): y-coordinates of the pixel centers.
+        pixels (ndarray): Pixel indices of the pairs.
+        points (ndarray): Point indices of the pairs.
+        size (int): Number of pixels.
+        power (float): Weighting power (default: ``1.0``).
+        smoothing (float): Smoothing parameter (default: ``0.0``).
+        min_points (int): Minimum number of points per pixel (default: ``0``).
+
+    Returns:
+        ndarray: Interpolated values of all pixels (``np.nan`` for pixels with less than ``min_points`` points).
+    """
+    distance_squared = (cloud["x"][points] - pixel_x[pixels]) ** 2 + (cloud["y"][points] - pixel_y[pixels]) ** 2
+    distance_squared += smoothing ** 2
+    values = cloud["values"][points]
+    exact = distance_squared == 0
+    weights = np.zeros_like(distance_squared)
+    weights[~exact] = distance_squared[~exact] ** (-0.5 * power)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        result = np.bincount(pixels, weights=weights * values, minlength=size) / \
+                 np.bincount(pixels, weights=weights, minlength=size)
+    # points that coincide with pixel centers define the pixel values
+    result[pixels[exact]] = values[exact]
+    result[np.bincount(pixels, minlength=size) < max(min_points, 1)] = np.nan
+    return result
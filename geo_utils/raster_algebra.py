@@ -0,0 +1,450 @@
+"""Lazy raster algebra: expressions of co-registered rasters are recorded and evaluated tile by tile, such that the
+memory usage is limited to a few tiles instead of one full-size array per intermediate result."""
+from .raster_mgmt import *
+import operator
+
+try:
+    # optional: numexpr fuses all operations of an expression into one pass over every tile
+    import numexpr
+except ImportError:
+    numexpr = None
+
+
+# operator name: (numpy function, numexpr template)
+binary_operators = {
+    "add": (operator.add, "({0} + {1})"),
+    "sub": (operator.sub, "({0} - {1})"),
+    "mul": (operator.mul, "({0} * {1})"),
+    "truediv": (operator.truediv, "({0} / {1})"),
+    "pow": (operator.pow, "({0} ** {1})"),
+    "mod": (operator.mod, "({0} % {1})"),
+    "lt": (operator.lt, "({0} < {1})"),
+    "le": (operator.le, "({0} <= {1})"),
+    "gt": (operator.gt, "({0} > {1})"),
+    "ge": (operator.ge, "({0} >= {1})"),
+    "eq": (operator.eq, "({0} == {1})"),
+    "ne": (operator.ne, "({0} != {1})"),
+    "and": (operator.and_, "({0} & {1})"),
+    "or": (operator.or_, "({0} | {1})"),
+}
+
+unary_operators = {
+    "neg": (operator.neg, "(-{0})"),
+    "invert": (operator.invert, "(~{0})"),
+    "abs": (np.abs, "abs({0})"),
+    "sqrt": (np.sqrt, "sqrt({0})"),
+    "exp": (np.exp, "exp({0})"),
+    "log": (np.log, "log({0})"),
+}
+
+reductions = ("sum", "mean", "min", "max", "count")
+
+
+class RasterExpr:
+    """Lazy expression of co-registered rasters, which supports arithmetic operators, comparisons, logical ``&``,
+    ``|``, and ``~`` operators, ``where``, element-wise functions, and reductions. Nothing is read before calling
+    ``compute`` or ``to_file``, which evaluate the expression tile by tile (with ``numexpr`` if installed).
+
+    Args:
+        source (``str`` or ``osgeo.gdal.Dataset``): A raster file name (including directory) or raster dataset, which
+                                                   must be re-openable by name (e.g., not an in-memory ``MEM`` dataset).
+        band_number (int): The raster band number to use (default: ``1``).
+
+    Raises:
+        ValueError: If ``source`` is a dataset without file name (e.g., a ``MEM`` dataset); write it to a file or a
+            ``/vsimem/`` GeoTIFF first.
+
+    Attributes:
+        op (str): The operation of the expression node (``"raster"`` for rasters).
+        args (tuple): The operands of the expression node.
+
+    Example:
+        .. code:: python
+
+            depth = RasterExpr("depth.tif")
+            velocity = RasterExpr("velocity.tif")
+            froude = velocity / (9.81 * depth).sqrt()
+            froude.to_file("froude.tif", workers=4)
+            supercritical_pixels = (froude > 1).sum().compute()
+    """
+
+    # make numpy defer to the reflected operators of RasterExpr (e.g., in ``np.float64(2) * expr``)
+    __array_priority__ = 1000
+
+    def __init__(self, source, band_number=1):
+        if not isinstance(source, str):
+            # datasets are referenced by file name to keep expressions picklable for worker processes
+            driver = source.GetDriver()
+            if not source.GetDescription() or (driver is not None and driver.ShortName == "MEM"):
+                raise ValueError("RasterExpr requires rasters that can be re-opened by file name (in-memory MEM "
+                                 "datasets are not supported; write them to a file or a /vsimem/ GeoTIFF first).")
+            source = source.GetDescription()
+        self.op = "raster"
+        self.args = (source, int(band_number))
+
+    @classmethod
+    def operation(cls, op, *args):
+        """Creates an expression node without reading any data.
+
+        Args:
+            op (str): Operation name (see ``binary_operators``, ``unary_operators``, ``reductions``, and ``"where"``).
+            *args: Operands (``RasterExpr`` or numbers).
+
+        Returns:
+            RasterExpr: The new expression node.
+        """
+        expr = cls.__new__(cls)
+        expr.op = op
+        expr.args = args
+        return expr
+
+    __hash__ = object.__hash__
+
+    def __add__(self, other):
+        return RasterExpr.operation("add", self, other)
+
+    def __radd__(self, other):
+        return RasterExpr.operation("add", other, self)
+
+    def __sub__(self, other):
+        return RasterExpr.operation("sub", self, other)
+
+    def __rsub__(self, other):
+        return RasterExpr.operation("sub", other, self)
+
+    def __mul__(self, other):
+        return RasterExpr.operation("mul", self, other)
+
+    def __rmul__(self, other):
+        return RasterExpr.operation("mul", other, self)
+
+    def __truediv__(self, other):
+        return RasterExpr.operation("truediv", self, other)
+
+    def __rtruediv__(self, other):
+        return RasterExpr.operation("truediv", other, self)
+
+    def __pow__(self, other):
+        return RasterExpr.operation("pow", self, other)
+
+    def __rpow__(self, other):
+        return RasterExpr.operation("pow", other, self)
+
+    def __mod__(self, other):
+        return RasterExpr.operation("mod", self, other)
+
+    def __lt__(self, other):
+        return RasterExpr.operation("lt", self, other)
+
+    def __le__(self, other):
+        return RasterExpr.operation("le", self, other)
+
+    def __gt__(self, other):
+        return RasterExpr.operation("gt", self, other)
+
+    def __ge__(self, other):
+        return RasterExpr.operation("ge", self, other)
+
+    def __eq__(self, other):
+        return RasterExpr.operation("eq", self, other)
+
+    def __ne__(self, other):
+        return RasterExpr.operation("ne", self, other)
+
+    def __and__(self, other):
+        return RasterExpr.operation("and", self, other)
+
+    def __rand__(self, other):
+        return RasterExpr.operation("and", other, self)
+
+    def __or__(self, other):
+        return RasterExpr.operation("or", self, other)
+
+    def __ror__(self, other):
+        return RasterExpr.operation("or", other, self)
+
+    def __neg__(self):
+        return RasterExpr.operation("neg", self)
+
+    def __invert__(self):
+        return RasterExpr.operation("invert", self)
+
+    def __abs__(self):
+        return RasterExpr.operation("abs", self)
+
+    def sqrt(self):
+        """Element-wise square root (lazy)."""
+        return RasterExpr.operation("sqrt", self)
+
+    def exp(self):
+        """Element-wise exponential function (lazy)."""
+        return RasterExpr.operation("exp", self)
+
+    def log(self):
+        """Element-wise natural logarithm (lazy)."""
+        return RasterExpr.operation("log", self)
+
+    @staticmethod
+    def where(condition, x, y):
+        """Element-wise selection of ``x`` where ``condition`` is ``True``, otherwise ``y`` (lazy ``np.where``).
+
+        Args:
+            condition (RasterExpr): A boolean expression, for example, a comparison.
+            x (``RasterExpr`` or number): Values where ``condition`` is ``True``.
+            y (``RasterExpr`` or number): Values where ``condition`` is ``False``.
+
+        Returns:
+            RasterExpr: The new expression node.
+        """
+        return RasterExpr.operation("where", condition, x, y)
+
+    def sum(self):
+        """Sum of all valid (not ``np.nan``) pixels (lazy reduction)."""
+        return RasterExpr.operation("sum", self)
+
+    def mean(self):
+        """Mean of all valid (not ``np.nan``) pixels (lazy reduction)."""
+        return RasterExpr.operation("mean", self)
+
+    def min(self):
+        """Minimum of all valid (not ``np.nan``) pixels (lazy reduction)."""
+        return RasterExpr.operation("min", self)
+
+    def max(self):
+        """Maximum of all valid (not ``np.nan``) pixels (lazy reduction)."""
+        return RasterExpr.operation("max", self)
+
+    def count(self):
+        """Number of valid (not ``np.nan``) pixels (lazy reduction)."""
+        return RasterExpr.operation("count", self)
+
+    def __repr__(self):
+        if self.op == "raster":
+            return "RasterExpr(%r, band_number=%i)" % self.args
+        return "RasterExpr.%s%r" % (self.op, self.args)
+
+    def get_sources(self):
+        """Gets the ``(file_name, band_number)`` tuples of all rasters in the expression.
+
+        Returns:
+            list: Unique ``(file_name, band_number)`` tuples in the order of their occurrence.
+        """
+        if self.op == "raster":
+            return [self.args]
+        sources = []
+        for arg in self.args:
+            if isinstance(arg, RasterExpr):
+                sources += [source for source in arg.get_sources() if source not in sources]
+        return sources
+
+    def get_grid(self):
+        """Gets the raster grid of the expression and verifies that all rasters are co-registered.
+
+        Returns:
+            tuple: ``(cols, rows, geo_transform, projection)`` (``None`` if the rasters are not aligned).
+        """
+        grid = None
+        for file_name, band_number in self.get_sources():
+            raster, band = open_raster(file_name, band_number=band_number)
+            try:
+                raster_grid = (raster.RasterXSize, raster.RasterYSize, raster.GetGeoTransform(), raster.GetProjection())
+            except AttributeError:
+                logging.error("Could not open %s." % str(file_name))
+                return None
+            if grid is None:
+                grid = raster_grid
+            elif raster_grid[0:2] != grid[0:2] or not np.allclose(raster_grid[2], grid[2]):
+                logging.error("%s is not aligned with the other rasters of the expression." % str(file_name))
+                return None
+        return grid
+
+    def has_nested_reduction(self):
+        """Checks if a reduction is nested inside the expression (reductions are only supported as top-level node,
+        for example, ``(a + 1).sum()`` but not ``a.sum() + 1``).
+
+        Returns:
+            bool: ``True`` if any node below the top-level node is a reduction.
+        """
+        nodes = [arg for arg in self.args if isinstance(arg, RasterExpr)] if self.op != "raster" else []
+        while nodes:
+            node = nodes.pop()
+            if node.op in reductions:
+                return True
+            if node.op != "raster":
+                nodes += [arg for arg in node.args if isinstance(arg, RasterExpr)]
+        return False
+
+    def evaluate(self, window):
+        """Evaluates the (non-reduced) expression for one tile.
+
+        Args:
+            window (tuple): Tile window ``(x_off, y_off, x_size, y_size)`` in pixels.
+
+        Returns:
+            ndarray: The tile array, where no-data pixels of the rasters are ``np.nan``.
+        """
+        arrays = {}
+        for i, (file_name, band_number) in enumerate(self.get_sources()):
+            raster, band = open_raster(file_name, band_number=band_number)
+            arrays["v%i" % i] = read_raster_window(band, window, nodata=band.GetNoDataValue())[0]
+        names = {source: "v%i" % i for i, source in enumerate(self.get_sources())}
+        if numexpr is not None:
+            try:
+                return numexpr.evaluate(self.to_numexpr(names), local_dict=arrays)
+            except (KeyError, SyntaxError, TypeError, ValueError, NotImplementedError):
+                # fall back to numpy for operations that numexpr does not support
+                pass
+        return self.evaluate_numpy(arrays, names)
+
+    def evaluate_numpy(self, arrays, names):
+        """Evaluates the expression tree with numpy (one temporary tile per operation).
+
+        Args:
+            arrays (dict): Tile arrays of the rasters (values) by variable name (keys).
+            names (dict): Variable names (values) by ``(file_name, band_number)`` (keys).
+
+        Returns:
+            ndarray: The tile array.
+        """
+        if self.op == "raster":
+            return arrays[names[self.args]]
+        args = [arg.evaluate_numpy(arrays, names) if isinstance(arg, RasterExpr) else arg for arg in self.args]
+        if self.op == "where":
+            return np.where(*args)
+        if self.op in binary_operators:
+            return binary_operators[self.op][0](*args)
+        if self.op in reductions:
+            raise ValueError("Reductions (%s) are only supported as top-level expression node." % self.op)
+        return unary_operators[self.op][0](*args)
+
+    def to_numexpr(self, names):
+        """Translates the expression tree into a ``numexpr`` expression string.
+
+        Args:
+            names (dict): Variable names (values) by ``(file_name, band_number)`` (keys).
+
+        Returns:
+            str: The expression string.
+        """
+        if self.op == "raster":
+            return names[self.args]
+        args = [arg.to_numexpr(names) if isinstance(arg, RasterExpr) else repr(np.asarray(arg).item())
+                for arg in self.args]
+        if self.op == "where":
+            return "where(%s, %s, %s)" % tuple(args)
+        if self.op in binary_operators:
+            return binary_operators[self.op][1].format(*args)
+        if self.op in reductions:
+            raise ValueError("Reductions (%s) are only supported as top-level expression node." % self.op)
+        return unary_operators[self.op][1].format(*args)
+
+    def compute(self, tile_size=512, workers=1):
+        """Evaluates the expression tile by tile.
+
+        Args:
+            tile_size (int): Tile size in pixels (default: ``512``).
+            workers (int): Number of worker processes (default: ``1`` evaluates all tiles in the calling process).
+
+        Returns:
+            ``ndarray`` or ``float``: The full-size result array, or a number if the expression ends with a reduction (``None`` if the rasters are not aligned or a reduction is nested in the expression).
+        """
+        if self.has_nested_reduction():
+            logging.error("Reductions are only supported as top-level expression node (e.g., (a + 1).sum(), not a.sum() + 1).")
+            return None
+        grid = self.get_grid()
+        if not grid:
+            return None
+        cols, rows = grid[0:2]
+        windows = iter_windows(cols, rows, tile_size, tile_size)
+
+        if self.op in reductions:
+            tasks = ((self.args[0], window) for window in windows)
+            count, total, minimum, maximum = 0, 0., np.inf, -np.inf
+            for tile_count, tile_sum, tile_min, tile_max in map_bounded(reduce_expr_tile, tasks, workers=workers):
+                count += tile_count
+                total += tile_sum
+                minimum = min(minimum, tile_min)
+                maximum = max(maximum, tile_max)
+            if self.op == "count":
+                return count
+            if count == 0:
+                return np.nan
+            return {"sum": total, "mean": total / count, "min": minimum, "max": maximum}[self.op]
+
+        result = None
+        tasks = ((self, window) for window in windows)
+        for window, tile in map_bounded(evaluate_expr_tile, tasks, workers=workers):
+            if result is None:
+                result = np.empty((rows, cols), dtype=tile.dtype)
+            result[window[1]:window[1] + window[3], window[0]:window[0] + window[2]] = tile
+        return result
+
+    def to_file(self, file_name, tile_size=512, workers=1, rdtype=gdal.GDT_Float32, nan_val=nan_value, **kwargs):
+        """Evaluates the expression tile by tile and streams the result into a tiled GeoTIFF (see ``RasterWriter``).
+
+        Args:
+            file_name (str): Target file name, including directory; must end on ``".tif"``.
+            tile_size (int): Tile size in pixels; must be a multiple of 16 (default: ``512``).
+            workers (int): Number of worker processes (default: ``1`` evaluates all tiles in the calling process).
+            rdtype: `gdal.GDALDataType <https://gdal.org/doxygen/gdal_8h.html#a22e22ce0a55036a96f652765793fb7a4>`_ of the output raster (default: gdal.GDT_Float32).
+            nan_val (``int`` or ``float``): No-data value of the output raster (default: ``geoconfig.nan_value``).
+
+        Keyword Args:
+            compress (str): Compression of the output raster (default: ``"DEFLATE"``).
+            options (list): Additional raster creation options (see ``RasterWriter``).
+
+        Returns:
+            int: ``0`` if successful, otherwise ``-1``.
+        """
+        if self.op in reductions:
+            logging.error("Cannot write the reduction %s to a raster (use compute)." % self.op)
+            return -1
+        if self.has_nested_reduction():
+            logging.error("Reductions are only supported as top-level expression node (e.g., (a + 1).sum(), not a.sum() + 1).")
+            return -1
+        grid = self.get_grid()
+        if not grid:
+            return -1
+        cols, rows, geo_transform, projection = grid
+        tasks = ((self, window) for window in iter_windows(cols, rows, tile_size, tile_size))
+        with RasterWriter(file_name, cols, rows, geo_info=geo_transform, projection=projection, nan_val=nan_val,
+                          rdtype=rdtype, block_size=tile_size, compress=kwargs.get("compress", "DEFLATE"),
+                          options=kwargs.get("options")) as writer:
+            if not writer.dataset:
+                return -1
+            for window, tile in map_bounded(evaluate_expr_tile, tasks, workers=workers):
+                if writer.write(tile, x_off=window[0], y_off=window[1]) < 0:
+                    return -1
+        return 0
+
+
+def evaluate_expr_tile(task):
+    """Evaluates a ``RasterExpr`` for one tile. This function is called by ``RasterExpr.compute`` and
+    ``RasterExpr.to_file`` (in worker processes).
+
+    Args:
+        task (tuple): ``(expr, window)``.
+
+    Returns:
+        tuple: The tile window and the tile array.
+    """
+    expr, window = task
+    return window, expr.evaluate(window)
+
+
+def reduce_expr_tile(task):
+    """Computes the partial reduction of a ``RasterExpr`` for one tile. This function is called by ``RasterExpr.compute``
+    (in worker processes).
+
+    Args:
+        task (tuple): ``(expr, window)``.
+
+    Returns:
+        tuple: ``(count, sum, min, max)`` of the valid (not ``np.nan``) tile pixels.
+    """
+    expr, window = task
+    values = np.asarray(expr.evaluate(window), dtype=np.float64)
+    values = values[~np.isnan(values)]
+    if values.size == 0:
+        return 0, 0., np.inf, -np.inf
+    return values.size, values.sum(), values.min(), values.max()
@@ -1,4 +1,4 @@
-from .geoconfig import *
+from .dataset_cache import *
 
 
 def open_raster(file_name, band_number=1):
@@ -13,9 +13,9 @@ def open_raster(file_name, band_number=1):
         osgeo.gdal.Band: The defined raster band as Python object.
     """
     gdal.UseExceptions()
-    # open raster file or return None if not accessible
+    # open raster file (or get its cached handle) or return None if not accessible
     try:
-        raster = gdal.Open(file_name)
+        raster = open_dataset(file_name)
     except RuntimeError as e:
         logging.error("Cannot open raster.")
         print(e)
@@ -30,14 +30,51 @@ def open_raster(file_name, band_number=1):
     return raster, raster_band
 
 
+def build_geo_transform(origin, pixel_width=10., pixel_height=10., rotation_angle=None, shear_pixels=True):
+    """Creates a GeoTransformation from an origin, pixel dimensions, and an optional rotation angle.
+
+    Args:
+        origin (tuple): Coordinates (x, y) of the origin.
+        pixel_width (float OR int): Pixel width as multiple of the base units defined with the EPSG number (default: ``10`` meters).
+        pixel_height (float OR int): Pixel height as multiple of the base units defined with the EPSG number (default: ``10`` meters).
+        rotation_angle (float): Rotate (in degrees) not North-up rasters (default: ``None`` corresponds to north-up).
+        shear_pixels (bool): Use with ``rotation_angle`` to shear pixels as well (default: ``True``).
+
+    Returns:
+        tuple: A ``gdal.DataSet.GetGeoTransform``-like tuple (``None`` if the arguments are invalid).
+    """
+    try:
+        origin_x = origin[0]
+        origin_y = origin[1]
+    except (IndexError, TypeError):
+        logging.error("Wrong origin format (required: (INT, INT) - provided: %s)." % str(origin))
+        return None
+    if rotation_angle:
+        try:
+            logging.info(" * rotating image by %0.2f deg" % float(rotation_angle))
+        except ValueError:
+            logging.error("The provided rotation angle is not a number. Re-try with a numeric rotation angle (in degrees).")
+            return None
+        rotation_angle = np.deg2rad(rotation_angle)
+        x_rotation = -1 * pixel_width * np.sin(rotation_angle)
+        y_rotation = -pixel_height * np.cos(rotation_angle)
+        if shear_pixels:
+            pixel_width = pixel_width * np.cos(rotation_angle)
+            pixel_height = pixel_height * np.sin(rotation_angle)
+    else:
+        x_rotation = 0.
+        y_rotation = 0.
+    return origin_x, pixel_width, x_rotation, origin_y, y_rotation, -pixel_height
+
+
 def create_raster(file_name, raster_array, bands=1, origin=None, epsg=4326, pixel_width=10., pixel_height=10.,
                   nan_val=nan_value, rdtype=gdal.GDT_Float32, geo_info=False, rotation_angle=None, shear_pixels=True,
-                  options=["PROFILE=GeoTIFF"]):
+                  options=["PROFILE=GeoTIFF"], cog=False, overviews=None, resampling="average"):
     """Converts an ``ndarray`` (``numpy.array``) to a GeoTIFF raster.
     
     Args:
         file_name (str): Target file name, including directory; must end on ``".tif"``.
-        raster_array (``ndarray`` or ``list``): Array or list of arrays of values to rasterize. If a list of arrays is provided, the length of the list will correspond to the number of bands added to the raster (supersedes ``bands``).
+        raster_array (``ndarray`` or ``list``): Array or list of arrays of values to rasterize. If a list of arrays or a 3-d ``(bands, rows, cols)`` array is provided, the length of the list (or first axis) will correspond to the number of bands added to the raster (supersedes ``bands``).
         bands (int): Number of bands to write to the raster (default: ``1``).
         origin (tuple): Coordinates (x, y) of the origin.
         epsg (int): EPSG:XXXX projection to use (default: ``4326``).
@@ -49,6 +86,9 @@ def create_raster(file_name, raster_array, bands=1, origin=None, epsg=4326, pixe
         rotation_angle (float): Rotate (in degrees) not North-up rasters. The default value (``0``) corresponds to north-up (only modify if you know what you are doing).
         shear_pixels (bool): Use with ``rotation_angle`` to shear pixels as well (default: ``True``).
         options (list): Raster creation options - default is ['PROFILE=GeoTIFF']. Add 'PHOTOMETRIC=RGB' to create an RGB image raster.
+        cog (bool): Write a Cloud-Optimized GeoTIFF (COG) with internal tiles and overviews (default: ``False``).
+        overviews (list): Overview (pyramid) levels as decimation factors, for example, ``[2, 4, 8, 16]`` (default: ``None`` creates no overviews, or ``[2, 4, 8, 16]`` if ``cog=True``).
+        resampling (str): Resampling method for overviews, for example, ``"nearest"``, ``"average"``, or ``"mode"`` (default: ``"average"``).
 
     Returns:
         int: ``0`` if successful, otherwise ``-1``.
@@ -57,81 +97,81 @@ def create_raster(file_name, raster_array, bands=1, origin=None, epsg=4326, pixe
         For processing airborne imagery, the ``roation_angle`` corresponds to the bearing angle of the aircraft with reference to true, not magnetic North.
     """
     gdal.UseExceptions()
-    # check out driver
-    driver = gdal.GetDriverByName("GTiff")
+    # check out driver (COGs are assembled in memory and copied to the GeoTIFF file afterwards)
+    driver = gdal.GetDriverByName("MEM" if cog else "GTiff")
 
     # create raster dataset with number of cols and rows of the input array
     try:
-        # overwrite number of bands if multiple arrays are provided in a list
+        # overwrite number of bands if multiple arrays are provided in a list or a 3-d array
         if type(raster_array) is list:
             bands = raster_array.__len__()
             cols = raster_array[0].shape[1]
             rows = raster_array[0].shape[0]
+        elif raster_array.ndim == 3:
+            bands, rows, cols = raster_array.shape
         else:
             cols = raster_array.shape[1]
             rows = raster_array.shape[0]
-    except TypeError:
+    except (TypeError, AttributeError):
         logging.error("Provided array is not a numpy.ndarray.")
         return -1
 
     try:
         logging.info(" * creating new raster with %1i bands ..." % bands)
-        new_raster = driver.Create(file_name, cols, rows, bands, eType=rdtype, options=options)
+        release_dataset(file_name)
+        if cog:
+            new_raster = driver.Create("", cols, rows, bands, eType=rdtype)
+        else:
+            new_raster = driver.Create(file_name, cols, rows, bands, eType=rdtype, options=options)
     except RuntimeError as e:
         logging.error("Could not create %s." % str(file_name))
         return -1
 
     # apply geo-origin and pixel dimensions
     if not geo_info:
-        try:
-            origin_x = origin[0]
-            origin_y = origin[1]
-        except IndexError:
-            logging.error("Wrong origin format (required: (INT, INT) - provided: %s)." % str(origin))
+        geo_info = build_geo_transform(origin, pixel_width=pixel_width, pixel_height=pixel_height,
+                                       rotation_angle=rotation_angle, shear_pixels=shear_pixels)
+        if not geo_info:
             return -1
-        if rotation_angle:
-            try:
-                logging.info(" * rotating image by %0.2f deg" % float(rotation_angle))
-            except ValueError:
-                logging.error("The provided rotation angle is not a number. Re-try with a numeric rotation angle (in degrees).")
-                return -1
-            rotation_angle = np.deg2rad(rotation_angle)
-            x_rotation = -1 * pixel_width * np.sin(rotation_angle)
-            y_rotation = -pixel_height * np.cos(rotation_angle)
-            if shear_pixels:
-                pixel_width = pixel_width * np.cos(rotation_angle)
-                pixel_height = pixel_height * np.sin(rotation_angle)
-        else:
-            x_rotation = 0.
-            y_rotation = 0.
+    try:
+        new_raster.SetGeoTransform(geo_info)
+    except RuntimeError as e:
+        logging.error(e)
+        return -1
 
+    # write array contents to band(s)
+    if type(raster_array) is not list and raster_array.ndim == 3:
+        # write all bands of 3-d arrays in one pass (gdal rounds and clamps values to rdtype, like band.WriteArray)
+        write_array = raster_array
+        if np.issubdtype(raster_array.dtype, np.floating):
+            # replace np.nan values in a copy (the provided array remains unchanged)
+            write_array = np.where(np.isnan(raster_array), nan_val, raster_array)
+        for b in range(bands):
+            band = new_raster.GetRasterBand(b + 1)
+            band.SetNoDataValue(nan_val)
+            band.SetScale(1.0)
         try:
-            new_raster.SetGeoTransform((origin_x, pixel_width, x_rotation, origin_y, y_rotation, -pixel_height))
-        except RuntimeError as e:
-            logging.error("Invalid origin (must be INT) or pixel_height/pixel_width (must be INT) provided.")
-            return -1
-    else:
-        try:
-            new_raster.SetGeoTransform(geo_info)
-        except RuntimeError as e:
+            new_raster.WriteArray(write_array)
+        except (RuntimeError, ValueError, TypeError) as e:
+            logging.error("Could not write the array (dtype=%s) to %s." % (str(raster_array.dtype), str(file_name)))
             logging.error(e)
             return -1
-
-    # write array contents to band(s)
-    for b in range(bands):
-        if type(raster_array) is list:
-            # use array item of list if multiple arrays provided
-            write_array = raster_array[b]
-        else:
-            write_array = raster_array
-        # replace np.nan values
-        write_array[np.isnan(write_array)] = nan_val
-        band = new_raster.GetRasterBand(b+1)
-        band.SetNoDataValue(nan_val)
-        band.WriteArray(write_array)
-        band.SetScale(1.0)
-        # release band
-        band.FlushCache()
+        new_raster.FlushCache()
+    else:
+        for b in range(bands):
+            if type(raster_array) is list:
+                # use array item of list if multiple arrays provided
+                write_array = raster_array[b]
+            else:
+                write_array = raster_array
+            # replace np.nan values
+            write_array[np.isnan(write_array)] = nan_val
+            band = new_raster.GetRasterBand(b+1)
+            band.SetNoDataValue(nan_val)
+            band.WriteArray(write_array)
+            band.SetScale(1.0)
+            # release band
+            band.FlushCache()
 
     # create projection and assign to raster
     srs = osr.SpatialReference()
@@ -141,38 +181,942 @@ def create_raster(file_name, raster_array, bands=1, origin=None, epsg=4326, pixe
         logging.error(e)
         return -1
     new_raster.SetProjection(srs.ExportToWkt())
+
+    if finalize_raster(new_raster, file_name, cog=cog, overviews=overviews, resampling=resampling, options=options) < 0:
+        return -1
     logging.info(" * successfully created %s" % file_name)
 
     return 0
 
 
-def raster2array(file_name, band_number=1):
+def finalize_raster(dataset, file_name, cog=False, overviews=None, resampling="average", options=None):
+    """Adds overviews to a new raster dataset or writes it to a Cloud-Optimized GeoTIFF (see ``write_cog``).
+
+    Args:
+        dataset (osgeo.gdal.Dataset): A new raster dataset (an in-memory ``MEM`` dataset if ``cog=True``).
+        file_name (str): Target file name, including directory; must end on ``".tif"``.
+        cog (bool): Write ``dataset`` to a Cloud-Optimized GeoTIFF named ``file_name`` (default: ``False``).
+        overviews (list): Overview levels as decimation factors (default: ``None``).
+        resampling (str): Resampling method for overviews (default: ``"average"``).
+        options (list): Additional raster creation options for COGs (default: ``None``).
+
+    Returns:
+        int: ``0`` if successful, otherwise ``-1``.
+    """
+    if cog:
+        return write_cog(dataset, file_name, overviews=overviews, resampling=resampling, options=options)
+    if overviews:
+        return build_overviews(dataset, overviews, resampling=resampling)
+    return 0
+
+
+def get_tile_file_name(file_name, cog=False):
+    """Gets the name of the raster that ``RasterWriter`` writes tile by tile before ``finalize_tiled_raster``.
+
+    Args:
+        file_name (str): Target file name, including directory; must end on ``".tif"``.
+        cog (bool): The target is a Cloud-Optimized GeoTIFF (default: ``False``).
+
+    Returns:
+        str: ``file_name``, or the name of a temporary ``*_tiles.tif`` raster if ``cog=True``.
+    """
+    # COGs require the overviews before the tiles and are copied from a temporary tiled raster
+    return os.path.splitext(file_name)[0] + "_tiles.tif" if cog else file_name
+
+
+def finalize_tiled_raster(file_name, cog=False, overviews=None, resampling="average"):
+    """Adds overviews to a raster written tile by tile (with ``RasterWriter`` to ``get_tile_file_name``), or copies
+    the temporary tiled raster to a Cloud-Optimized GeoTIFF and removes it.
+
+    Args:
+        file_name (str): Target file name, including directory; must end on ``".tif"``.
+        cog (bool): Write a Cloud-Optimized GeoTIFF named ``file_name`` (default: ``False``).
+        overviews (list): Overview levels as decimation factors (default: ``None``).
+        resampling (str): Resampling method for overviews (default: ``"average"``).
+
+    Returns:
+        int: ``0`` if successful, otherwise ``-1``.
+    """
+    if cog:
+        tile_file_name = get_tile_file_name(file_name, cog=True)
+        result = write_cog(open_dataset(tile_file_name), file_name, overviews=overviews, resampling=resampling)
+        remove_tif(tile_file_name)
+        return result
+    if overviews:
+        result = build_overviews(open_dataset(file_name, update=True), overviews, resampling=resampling)
+        release_dataset(file_name)
+        return result
+    return 0
+
+
+def build_overviews(dataset, overviews=(2, 4, 8, 16), resampling="average"):
+    """Builds overviews (pyramids) of all bands of a raster dataset.
+
+    Args:
+        dataset (osgeo.gdal.Dataset): A raster dataset (internal overviews are built for GeoTIFFs opened for writing).
+        overviews (list): Overview levels as decimation factors (default: ``(2, 4, 8, 16)``).
+        resampling (str): Resampling method, for example, ``"nearest"``, ``"average"``, or ``"mode"`` (default: ``"average"``).
+
+    Returns:
+        int: ``0`` if successful, otherwise ``-1``.
+    """
+    # skip levels that would be smaller than one pixel
+    levels = [int(level) for level in overviews if min(dataset.RasterXSize, dataset.RasterYSize) // int(level) >= 1]
+    try:
+        logging.info(" * building overviews %s (%s resampling) ..." % (str(levels), resampling))
+        dataset.BuildOverviews(str(resampling).upper(), levels)
+    except RuntimeError as e:
+        logging.error("Could not build overviews.")
+        logging.error(e)
+        return -1
+    return 0
+
+
+def write_cog(dataset, file_name, overviews=None, resampling="average", options=None):
+    """Writes a raster dataset to a Cloud-Optimized GeoTIFF (COG) with internal tiles and overviews, where the
+    overviews are stored before the full-resolution tiles.
+
+    Args:
+        dataset (osgeo.gdal.Dataset): Source raster dataset (for example, an in-memory ``MEM`` dataset).
+        file_name (str): Target file name, including directory; must end on ``".tif"``.
+        overviews (list): Overview levels as decimation factors (default: ``None`` corresponds to ``[2, 4, 8, 16]``).
+                          Existing overviews of ``dataset`` are re-used.
+        resampling (str): Resampling method for overviews (default: ``"average"``).
+        options (list): Additional raster creation options, for example, ``["PHOTOMETRIC=RGB"]`` (default: ``None``).
+
+    Returns:
+        int: ``0`` if successful, otherwise ``-1``.
+    """
+    if dataset.GetRasterBand(1).GetOverviewCount() == 0:
+        if build_overviews(dataset, overviews or (2, 4, 8, 16), resampling=resampling) < 0:
+            return -1
+    cog_options = ["TILED=YES", "BLOCKXSIZE=512", "BLOCKYSIZE=512", "COMPRESS=DEFLATE", "COPY_SRC_OVERVIEWS=YES",
+                   "BIGTIFF=IF_SAFER"]
+    # user-defined options supersede the COG defaults
+    user_keys = [option.split("=")[0].upper() for option in options or []]
+    cog_options = [option for option in cog_options if option.split("=")[0] not in user_keys] + list(options or [])
+    try:
+        release_dataset(file_name)
+        gdal.GetDriverByName("GTiff").CreateCopy(file_name, dataset, options=cog_options)
+    except RuntimeError as e:
+        logging.error("Could not create %s." % str(file_name))
+        logging.error(e)
+        # remove the partially written file, which would otherwise pass for an existing output
+        release_dataset(file_name)
+        try:
+            if gdal.VSIStatL(str(file_name)) is not None:
+                gdal.Unlink(str(file_name))
+        except RuntimeError:
+            logging.warning("Could not remove the incomplete file %s." % str(file_name))
+        return -1
+    logging.info(" * successfully created %s (COG)" % file_name)
+    return 0
+
+
+class RasterWriter:
+    """Writes a tiled GeoTIFF raster incrementally (tile by tile) to enable outputs that are larger than memory.
+
+    Use the class as a context manager, which closes (flushes) the raster at the end of the ``with`` statement.
+
+    Args:
+        file_name (str): Target file name, including directory; must end on ``".tif"``.
+        cols (int): Number of raster columns (pixels in x-direction).
+        rows (int): Number of raster rows (pixels in y-direction).
+        bands (int): Number of bands to write to the raster (default: ``1``).
+        origin (tuple): Coordinates (x, y) of the origin.
+        epsg (int): EPSG:XXXX projection to use (default: ``4326``).
+        pixel_width (float OR int): Pixel width as multiple of the base units defined with the EPSG number (default: ``10`` meters).
+        pixel_height (float OR int): Pixel height as multiple of the base units defined with the EPSG number (default: ``10`` meters).
+        nan_val (``int`` or ``float``): No-data value to be used in the raster. Replaces ``np.nan`` in written tiles (default: ``geoconfig.nan_value``).
+        rdtype: `gdal.GDALDataType <https://gdal.org/doxygen/gdal_8h.html#a22e22ce0a55036a96f652765793fb7a4>`_ raster data type (default: gdal.GDT_Float32 (32 bit floating point).
+        geo_info (tuple): Defines a ``gdal.DataSet.GetGeoTransform`` object  and supersedes ``origin``, ``pixel_width``, ``pixel_height`` (default: ``False``).
+        rotation_angle (float): Rotate (in degrees) not North-up rasters (see ``create_raster``).
+        shear_pixels (bool): Use with ``rotation_angle`` to shear pixels as well (default: ``True``).
+        block_size (int): Internal tile size in pixels (``BLOCKXSIZE`` and ``BLOCKYSIZE``); must be a multiple of 16 (default: ``256``).
+        compress (str): GeoTIFF compression method, for example, ``"LZW"``; ``None`` disables compression (default: ``"DEFLATE"``).
+        options (list): Additional raster creation options, which supersede the default options (default: ``None``).
+        projection (str): WKT-formatted spatial reference that supersedes ``epsg``, where an empty string ``""`` (e.g.,
+                          ``GetProjection`` of a raster without spatial reference) writes no projection (default:
+                          ``None`` uses ``epsg``).
+
+    Attributes:
+        dataset (osgeo.gdal.Dataset): The raster dataset (``None`` if the raster could not be created or is closed).
+
+    Example:
+        .. code:: python
+
+            with RasterWriter("big.tif", cols=40000, rows=40000, origin=(0, 0), epsg=25832) as writer:
+                for window, array, geo_transform in iter_raster_blocks("input.tif"):
+                    writer.write(array * 2, x_off=window[0], y_off=window[1])
+    """
+
+    def __init__(self, file_name, cols, rows, bands=1, origin=None, epsg=4326, pixel_width=10., pixel_height=10.,
+                 nan_val=nan_value, rdtype=gdal.GDT_Float32, geo_info=False, rotation_angle=None, shear_pixels=True,
+                 block_size=256, compress="DEFLATE", options=None, projection=None):
+        gdal.UseExceptions()
+        self.file_name = file_name
+        self.cols = int(cols)
+        self.rows = int(rows)
+        self.bands = int(bands)
+        self.nan_val = nan_val
+        self.dataset = None
+
+        # merge default and user-defined creation options (user-defined options win)
+        creation_options = {"TILED": "YES",
+                            "BLOCKXSIZE": str(block_size),
+                            "BLOCKYSIZE": str(block_size),
+                            "BIGTIFF": "IF_SAFER"}
+        if compress:
+            creation_options["COMPRESS"] = str(compress).upper()
+        for option in options or []:
+            key, value = option.split("=", 1)
+            creation_options[key.upper()] = value
+
+        if not geo_info:
+            geo_info = build_geo_transform(origin, pixel_width=pixel_width, pixel_height=pixel_height,
+                                           rotation_angle=rotation_angle, shear_pixels=shear_pixels)
+            if not geo_info:
+                return
+
+        srs = osr.SpatialReference()
+        try:
+            if projection is None:
+                srs.ImportFromEPSG(epsg)
+            elif projection:
+                srs.ImportFromWkt(projection)
+            else:
+                srs = None
+        except RuntimeError as e:
+            logging.error(e)
+            return
+
+        try:
+            logging.info(" * creating new tiled raster with %1i bands ..." % self.bands)
+            release_dataset(file_name)
+            self.dataset = gdal.GetDriverByName("GTiff").Create(
+                file_name, self.cols, self.rows, self.bands, eType=rdtype,
+                options=["%s=%s" % (key, value) for key, value in creation_options.items()])
+        except RuntimeError as e:
+            logging.error("Could not create %s." % str(file_name))
+            logging.error(e)
+            return
+        self.dataset.SetGeoTransform(geo_info)
+        if srs is not None:
+            self.dataset.SetProjection(srs.ExportToWkt())
+        for b in range(self.bands):
+            band = self.dataset.GetRasterBand(b + 1)
+            band.SetNoDataValue(nan_val)
+            band.SetScale(1.0)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def write(self, array, x_off=0, y_off=0, band_number=None):
+        """Writes a tile to the raster.
+
+        Args:
+            array (ndarray): A 2-d tile array or a 3-d ``(bands, rows, cols)`` array of tiles for all bands.
+            x_off (int): Column offset (number of pixels) of the upper-left tile pixel (default: ``0``).
+            y_off (int): Row offset (number of pixels) of the upper-left tile pixel (default: ``0``).
+            band_number (int): The band to write a 2-d array to (default: ``None`` corresponds to band ``1``).
+
+        Returns:
+            int: ``0`` if successful, otherwise ``-1``.
+        """
+        if not self.dataset:
+            logging.error("%s is not open for writing." % str(self.file_name))
+            return -1
+        array = np.asarray(array)
+        if array.ndim == 2:
+            tiles = {band_number or 1: array}
+        else:
+            tiles = {b + 1: array[b] for b in range(array.shape[0])}
+        if (x_off + array.shape[-1] > self.cols) or (y_off + array.shape[-2] > self.rows) or min(x_off, y_off) < 0:
+            logging.error("The tile at offset (%i, %i) exceeds the raster extent." % (x_off, y_off))
+            return -1
+        for b, tile in tiles.items():
+            if np.issubdtype(tile.dtype, np.floating):
+                # replace np.nan values (without modifying the provided array)
+                tile = np.where(np.isnan(tile), self.nan_val, tile)
+            try:
+                self.dataset.GetRasterBand(b).WriteArray(tile, int(x_off), int(y_off))
+            except (RuntimeError, AttributeError) as e:
+                logging.error("Could not write tile to band %s." % str(b))
+                logging.error(e)
+                return -1
+        return 0
+
+    def close(self):
+        """Flushes all tiles to the disk and releases the raster dataset."""
+        if self.dataset:
+            self.dataset.FlushCache()
+            self.dataset = None
+            logging.info(" * successfully created %s" % self.file_name)
+
+
+def raster2array(file_name, band_number=1, mode="gdal", nodata="nan", out=None, overview=None):
     """Extracts an ``ndarray`` from a raster.
     
     Args:
-        file_name (str): Target file name, including directory; must end on ``".tif"``.
-        band_number (int): The raster band number to open (default: ``1``).
+        file_name (str): Raster file name, including directory (e.g., a GeoTIFF or a VRT from ``build_mosaic``).
+        band_number (``int``, ``list``, or ``str``): The raster band number to open (default: ``1``). Use a list of
+                    band numbers (e.g., ``[1, 2, 3]``) or ``"all"`` to read multiple bands in one call into a
+                    ``(bands, rows, cols)`` array.
+        mode (str): Use ``"gdal"`` (default) to read a copy of the band array through gdal, or ``"mmap"`` to get a
+                    read-only view of an uncompressed GeoTIFF on the disk (see ``raster2memmap``; single bands only).
+        nodata (str): Use ``"nan"`` (default) to replace no-data values with ``np.nan``, or ``"mask"`` to return a
+                      ``numpy.ma.MaskedArray`` in the native data type of the band (no copy and no float conversion).
+        out (ndarray): Optional pre-allocated array with the shape ``(rows, cols)`` (or ``(bands, rows, cols)``) to read
+                       into, for example, to re-use memory in repeated reads (default: ``None``). Must have a floating
+                       point data type with ``nodata="nan"``.
+        overview (int): Index of an overview (pyramid) level to read instead of the full resolution, where ``0`` is
+                        the finest overview (default: ``None``). The GeoTransformation is scaled accordingly.
         
     Returns:
-        ndarray: Indicated raster band, where no-data values are replaced with ``np.nan``.
+        ndarray: Indicated raster band(s), where no-data values are replaced with ``np.nan``. With ``nodata="mask"`` or ``mode="mmap"``, a ``numpy.ma.MaskedArray`` where no-data pixels are masked (``mode="mmap"`` wraps a read-only ``numpy.memmap``).
         GeoTransform: The GeoTransformation used in the original raster.
     """
+    multi_band = isinstance(band_number, (list, tuple)) or (band_number == "all")
+    if mode == "mmap":
+        if not multi_band and overview is None:
+            raster, band_array = raster2memmap(file_name, band_number=band_number)
+            if band_array is not None:
+                return raster, mask_nodata(band_array, raster.GetRasterBand(band_number).GetNoDataValue()), raster.GetGeoTransform()
+        logging.warning("Cannot memory-map %s (falling back to reading through gdal)." % str(file_name))
+        nodata = "mask"
+
+    if (nodata == "nan") and (out is not None) and not np.issubdtype(out.dtype, np.floating):
+        logging.error("The out array must have a floating point data type to store np.nan (use nodata='mask').")
+        return None, None, nan_value
+
     # open the raster and band (see above)
-    raster, band = open_raster(file_name, band_number=band_number)
+    raster, band = open_raster(file_name, band_number=1 if multi_band else band_number)
     try:
-        # read array data from band
-        band_array = band.ReadAsArray()
+        if multi_band:
+            band_numbers = read_band_numbers(raster, band_number)
+            # read all bands with one (band-interleaved) call
+            band_array = read_bands(raster, band_numbers, out=out, overview=overview)
+            band_nodata = [raster.GetRasterBand(b).GetNoDataValue() for b in band_numbers]
+        else:
+            # read array data from band (or its overview)
+            band_nodata = band.GetNoDataValue()
+            if overview is not None:
+                band = band.GetOverview(int(overview))
+            band_array = band.ReadAsArray(buf_obj=out)
     except AttributeError:
         logging.error("Could not read array of raster band type=%s." % str(type(band)))
         return raster, band, nan_value
-    try:
-        # overwrite NoDataValues with np.nan
-        band_array = np.where(band_array == band.GetNoDataValue(), np.nan, band_array)
-    except AttributeError:
-        logging.error("Could not get NoDataValue of raster band type=%s." % str(type(band)))
+    except RuntimeError as e:
+        logging.error("Could not read raster bands %s." % str(band_number))
+        logging.error(e)
         return raster, band, nan_value
+    geo_transform = raster.GetGeoTransform()
+    if overview is not None:
+        # scale the pixel size to the overview resolution
+        scale_x = raster.RasterXSize / band_array.shape[-1]
+        scale_y = raster.RasterYSize / band_array.shape[-2]
+        geo_transform = (geo_transform[0], geo_transform[1] * scale_x, geo_transform[2] * scale_y,
+                         geo_transform[3], geo_transform[4] * scale_x, geo_transform[5] * scale_y)
+    if nodata == "mask":
+        return raster, mask_nodata(band_array, band_nodata), geo_transform
+
+    # overwrite NoDataValues with np.nan
+    if not np.issubdtype(band_array.dtype, np.floating):
+        band_array = band_array.astype(np.float64)
+    if multi_band:
+        for b, value in enumerate(band_nodata):
+            if value is not None:
+                band_array[b][band_array[b] == value] = np.nan
+    elif band_nodata is not None:
+        band_array[band_array == band_nodata] = np.nan
     # return the array and GeoTransformation used in the original raster
-    return raster, band_array, raster.GetGeoTransform()
+    return raster, band_array, geo_transform
+
+
+def read_band_numbers(raster, band_number):
+    """Gets a list of band numbers from a list of band numbers or ``"all"``.
+
+    Args:
+        raster (osgeo.gdal.Dataset): The raster dataset.
+        band_number (``list`` or ``str``): List of band numbers or ``"all"``.
+
+    Returns:
+        list: Band numbers (``int``).
+    """
+    if band_number == "all":
+        return list(range(1, raster.RasterCount + 1))
+    return [int(b) for b in band_number]
+
+
+def read_bands(raster, band_numbers, out=None, overview=None):
+    """Reads multiple raster bands with a single ``ReadAsArray`` call.
+
+    Args:
+        raster (osgeo.gdal.Dataset): The raster dataset.
+        band_numbers (list): Band numbers to read.
+        out (ndarray): Optional pre-allocated array with the shape ``(bands, rows, cols)`` (default: ``None``).
+        overview (int): Index of an overview level to read (default: ``None`` reads the full resolution).
+
+    Returns:
+        ndarray: A ``(bands, rows, cols)`` array.
+    """
+    buf_size = {}
+    if overview is not None:
+        # gdal reads from the overview that matches the buffer size
+        overview_band = raster.GetRasterBand(band_numbers[0]).GetOverview(int(overview))
+        buf_size = {"buf_xsize": overview_band.XSize, "buf_ysize": overview_band.YSize}
+    if len(band_numbers) == 1:
+        band_buffer = None if out is None else out[0]
+        return raster.GetRasterBand(band_numbers[0]).ReadAsArray(buf_obj=band_buffer, **buf_size)[np.newaxis]
+    if band_numbers == list(range(1, raster.RasterCount + 1)):
+        return raster.ReadAsArray(buf_obj=out, **buf_size)
+    # select (and re-order) the bands through a light-weight virtual raster
+    band_selection = gdal.Translate("", raster, format="VRT", bandList=band_numbers)
+    return band_selection.ReadAsArray(buf_obj=out, **buf_size)
+
+
+def mask_nodata(array, nodata):
+    """Masks no-data pixels of an array without copying or converting the array data.
+
+    Args:
+        array (ndarray): Raster band array or ``(bands, rows, cols)`` array.
+        nodata (``int``, ``float``, or ``list``): The no-data value of the raster band (``None`` if not defined), or
+                                                  a list of no-data values for every band of a 3-d array.
+
+    Returns:
+        numpy.ma.MaskedArray: Masked array that shares its data with ``array``.
+    """
+    if isinstance(nodata, (list, tuple)):
+        if all(value is None for value in nodata):
+            return np.ma.MaskedArray(array, mask=np.ma.nomask, copy=False)
+        mask = np.zeros(array.shape, dtype=bool)
+        for b, value in enumerate(nodata):
+            mask[b] = np.ma.getmaskarray(mask_nodata(array[b], value))
+        return np.ma.MaskedArray(array, mask=mask, copy=False)
+    if nodata is None:
+        mask = np.ma.nomask
+    elif np.isnan(nodata):
+        mask = np.isnan(array)
+    else:
+        mask = array == nodata
+    return np.ma.MaskedArray(array, mask=mask, copy=False)
+
+
+def raster2memmap(file_name, band_number=1):
+    """Maps the pixel data of an uncompressed, untiled (striped) GeoTIFF band to a read-only ``numpy.memmap``.
+    The data is not copied and all processes that map the same file share the operating system's page cache.
+
+    Args:
+        file_name (str): Target file name, including directory; must end on ``".tif"``.
+        band_number (int): The raster band number to open (default: ``1``).
+
+    Returns:
+        osgeo.gdal.Dataset: The raster dataset.
+        numpy.memmap: Read-only view of the band with shape ``(rows, cols)`` in the native data type (``None`` if the file layout cannot be mapped, for example, because of compression or tiling).
+    """
+    raster, band = open_raster(file_name, band_number=band_number)
+    try:
+        if raster.GetDriver().ShortName != "GTiff":
+            return raster, None
+        path = raster.GetFileList()[0]
+        cols, rows, bands = raster.RasterXSize, raster.RasterYSize, raster.RasterCount
+        block_x, block_y = band.GetBlockSize()
+        dtype = np.dtype(gdal_numpy_dtype_dict[band.DataType])
+    except (AttributeError, KeyError):
+        return raster, None
+
+    # only uncompressed full-byte pixels in strips can be mapped
+    if band.GetMetadataItem("COMPRESSION", "IMAGE_STRUCTURE") not in (None, "NONE"):
+        return raster, None
+    if band.GetMetadataItem("NBITS", "IMAGE_STRUCTURE") or block_x != cols or not os.path.isfile(path):
+        return raster, None
+    pixel_interleaved = (bands > 1) and (raster.GetMetadataItem("INTERLEAVE", "IMAGE_STRUCTURE") == "PIXEL")
+
+    # verify that all strips are stored contiguously
+    strip_bytes = block_y * cols * dtype.itemsize * (bands if pixel_interleaved else 1)
+    offsets = []
+    for strip in range(int(np.ceil(rows / block_y))):
+        offset = band.GetMetadataItem("BLOCK_OFFSET_0_%i" % strip, "TIFF")
+        if not offset:
+            # sparse (not yet written) strip
+            return raster, None
+        offsets.append(int(offset))
+    if any(offset != offsets[0] + i * strip_bytes for i, offset in enumerate(offsets)):
+        return raster, None
+
+    # apply the byte order of the TIFF header
+    with open(path, "rb") as f:
+        dtype = dtype.newbyteorder("<" if f.read(2) == b"II" else ">")
+
+    if pixel_interleaved:
+        # pixel interleaved strips start with the first band
+        band_view = np.memmap(path, dtype=dtype, mode="r", offset=offsets[0], shape=(rows, cols, bands))
+        return raster, band_view[:, :, band_number - 1]
+    return raster, np.memmap(path, dtype=dtype, mode="r", offset=offsets[0], shape=(rows, cols))
+
+
+def get_window_geo_transform(geo_transform, x_off, y_off):
+    """Shifts the origin of a GeoTransformation to the upper-left corner of a raster window.
+
+    Args:
+        geo_transform (tuple): A ``osgeo.gdal.Dataset.GetGeoTransform`` object of the full raster.
+        x_off (int): Column offset (number of pixels) of the window.
+        y_off (int): Row offset (number of pixels) of the window.
+
+    Returns:
+        tuple: GeoTransformation of the window (rotation terms are preserved).
+    """
+    return (geo_transform[0] + x_off * geo_transform[1] + y_off * geo_transform[2],
+            geo_transform[1],
+            geo_transform[2],
+            geo_transform[3] + x_off * geo_transform[4] + y_off * geo_transform[5],
+            geo_transform[4],
+            geo_transform[5])
+
+
+def crop_halo(array, window, halo):
+    """Removes the halo (overlap) of an array yielded by ``iter_raster_blocks``.
+
+    Args:
+        array (ndarray): Block array including the halo pixels.
+        window (tuple): The block window ``(x_off, y_off, x_size, y_size)`` yielded along with ``array``.
+        halo (int): The halo width (number of pixels) used in ``iter_raster_blocks``.
+
+    Returns:
+        ndarray: View of ``array`` limited to the extent of ``window``.
+    """
+    left = min(halo, window[0])
+    top = min(halo, window[1])
+    return array[..., top:top + window[3], left:left + window[2]]
+
+
+def iter_raster_blocks(file_name, band_number=1, block_size=None, halo=0):
+    """Iterates block-wise over a raster band to limit the memory usage to the size of one block.
+
+    Args:
+        file_name (str): Raster file name, including directory (e.g., a GeoTIFF or a VRT from ``build_mosaic``).
+        band_number (int): The raster band number to open (default: ``1``).
+        block_size (``int`` or ``tuple``): Block size in pixels as ``(x_size, y_size)`` or a single ``int`` for
+                                           square blocks (default: ``None`` uses the native block size of the band).
+        halo (int): Number of overlapping pixels to read around every block, for example, for moving-window
+                    operations (default: ``0``). The halo is cropped at the raster edges.
+
+    Yields:
+        tuple: ``(window, array, window_geo_transform)``, where ``window`` is the block extent
+        ``(x_off, y_off, x_size, y_size)`` in pixels without halo, ``array`` is the block ``ndarray`` including the
+        halo with no-data values replaced by ``np.nan``, and ``window_geo_transform`` is the GeoTransformation of the
+        upper-left pixel of ``array``.
+
+    Hint:
+        Use ``crop_halo(array, window, halo)`` to strip the halo from a processed block array.
+    """
+    raster, band = open_raster(file_name, band_number=band_number)
+    try:
+        cols = band.XSize
+        rows = band.YSize
+        nodata = band.GetNoDataValue()
+    except AttributeError:
+        logging.error("Could not read raster band type=%s." % str(type(band)))
+        return
+
+    if not block_size:
+        block_x, block_y = band.GetBlockSize()
+    elif isinstance(block_size, int):
+        block_x, block_y = block_size, block_size
+    else:
+        block_x, block_y = int(block_size[0]), int(block_size[1])
+    halo = int(halo)
+    geo_transform = raster.GetGeoTransform()
+
+    for window in iter_windows(cols, rows, block_x, block_y):
+        block_array, read_window = read_raster_window(band, window, halo=halo, nodata=nodata)
+        yield window, block_array, get_window_geo_transform(geo_transform, read_window[0], read_window[1])
+
+
+def iter_windows(cols, rows, block_x, block_y):
+    """Iterates row by row over the windows (blocks) of a raster.
+
+    Args:
+        cols (int): Number of raster columns.
+        rows (int): Number of raster rows.
+        block_x (int): Window width in pixels.
+        block_y (int): Window height in pixels.
+
+    Yields:
+        tuple: Window ``(x_off, y_off, x_size, y_size)`` in pixels, cropped at the raster edges.
+    """
+    for y_off in range(0, rows, block_y):
+        for x_off in range(0, cols, block_x):
+            yield x_off, y_off, min(block_x, cols - x_off), min(block_y, rows - y_off)
+
+
+def read_raster_window(band, window, halo=0, nodata=None):
+    """Reads a window of a raster band with an optional halo (overlap) that is cropped at the raster edges.
+
+    Args:
+        band (osgeo.gdal.Band): The raster band to read from.
+        window (tuple): Window ``(x_off, y_off, x_size, y_size)`` in pixels.
+        halo (int): Number of overlapping pixels to read around the window (default: ``0``).
+        nodata (``int`` or ``float``): No-data value to replace with ``np.nan`` (default: ``None``).
+
+    Returns:
+        ndarray: The window array including the halo.
+        tuple: The window that was read ``(x_off, y_off, x_size, y_size)`` including the halo.
+    """
+    x_off, y_off, x_size, y_size = window
+    read_x_off = max(0, x_off - halo)
+    read_y_off = max(0, y_off - halo)
+    read_window = (read_x_off, read_y_off,
+                   min(band.XSize, x_off + x_size + halo) - read_x_off,
+                   min(band.YSize, y_off + y_size + halo) - read_y_off)
+    array = band.ReadAsArray(*read_window)
+    if nodata is not None:
+        # overwrite NoDataValues with np.nan (same as raster2array)
+        array = np.where(array == nodata, np.nan, array)
+    return array, read_window
+
+
+def map_raster_tiles(func, inputs, output, tile_size=512, halo=0, workers=1, band_number=1, bands=1,
+                     rdtype=gdal.GDT_Float32, nan_val=nan_value, func_kwargs=None, **kwargs):
+    """Applies a function tile by tile to one or more aligned (co-registered) rasters in a process pool and streams
+    the resulting tiles into a tiled GeoTIFF (see ``RasterWriter``). The memory usage is limited to a few tiles per
+    worker, regardless of the raster size.
+
+    Args:
+        func (callable): A module-level (picklable) function that takes one tile array per input raster (no-data
+                         pixels are ``np.nan``) and returns a 2-d array (or a ``(bands, rows, cols)`` array) with the
+                         same shape as the input tiles (including the halo) or the shape of the tile without halo.
+        inputs (``str`` or ``list``): File name(s) of the input raster(s), including directory, which must have the
+                                      same size and GeoTransformation.
+        output (str): Target file name, including directory; must end on ``".tif"``.
+        tile_size (int): Tile size in pixels; must be a multiple of 16 (default: ``512``).
+        halo (int): Number of overlapping pixels passed to ``func`` around every tile, for example, for moving-window
+                    operations (default: ``0``).
+        workers (int): Number of worker processes (default: ``1`` processes all tiles in the calling process; ``None``
+                       uses all CPU cores).
+        band_number (int): The band number to read from every input raster (default: ``1``).
+        bands (int): Number of bands of the output raster (default: ``1``).
+        rdtype: `gdal.GDALDataType <https://gdal.org/doxygen/gdal_8h.html#a22e22ce0a55036a96f652765793fb7a4>`_ of the output raster (default: gdal.GDT_Float32).
+        nan_val (``int`` or ``float``): No-data value of the output raster (default: ``geoconfig.nan_value``).
+        func_kwargs (dict): Optional keyword arguments to pass to ``func`` (default: ``None``).
+
+    Keyword Args:
+        compress (str): Compression of the output raster (default: ``"DEFLATE"``).
+        options (list): Additional raster creation options (see ``RasterWriter``).
+
+    Returns:
+        int: ``0`` if successful, otherwise ``-1``.
+
+    Example:
+        .. code:: python
+
+            def froude(depth, velocity):
+                return velocity / np.sqrt(9.81 * depth)
+
+            map_raster_tiles(froude, ["depth.tif", "velocity.tif"], "froude.tif", workers=8)
+    """
+    if isinstance(inputs, str):
+        inputs = [inputs]
+    raster, band = open_raster(inputs[0], band_number=band_number)
+    try:
+        cols, rows = raster.RasterXSize, raster.RasterYSize
+        geo_transform = raster.GetGeoTransform()
+        projection = raster.GetProjection()
+    except AttributeError:
+        logging.error("Could not open %s." % str(inputs[0]))
+        return -1
+    for file_name in inputs[1:]:
+        other_raster, other_band = open_raster(file_name, band_number=band_number)
+        try:
+            aligned = (other_raster.RasterXSize, other_raster.RasterYSize) == (cols, rows) and \
+                      np.allclose(other_raster.GetGeoTransform(), geo_transform)
+        except AttributeError:
+            aligned = False
+        if not aligned:
+            logging.error("%s is not aligned with %s." % (str(file_name), str(inputs[0])))
+            return -1
+
+    windows = iter_windows(cols, rows, tile_size, tile_size)
+    tasks = ((func, inputs, window, halo, band_number, func_kwargs or {}) for window in windows)
+    with RasterWriter(output, cols, rows, bands=bands, geo_info=geo_transform, projection=projection,
+                      nan_val=nan_val, rdtype=rdtype, block_size=tile_size,
+                      compress=kwargs.get("compress", "DEFLATE"), options=kwargs.get("options")) as writer:
+        if not writer.dataset:
+            return -1
+        for window, tile in map_bounded(apply_to_tile, tasks, workers=workers):
+            if writer.write(tile, x_off=window[0], y_off=window[1]) < 0:
+                return -1
+    return 0
+
+
+def apply_to_tile(task):
+    """Reads a tile (with halo) of every input raster, applies a function, and crops the halo from the result.
+    This function is called by ``map_raster_tiles`` (in worker processes).
+
+    Args:
+        task (tuple): ``(func, inputs, window, halo, band_number, func_kwargs)``.
+
+    Returns:
+        tuple: The tile window ``(x_off, y_off, x_size, y_size)`` and the result array of ``func`` without halo.
+    """
+    func, inputs, window, halo, band_number, func_kwargs = task
+    arrays = []
+    for file_name in inputs:
+        raster, band = open_raster(file_name, band_number=band_number)
+        arrays.append(read_raster_window(band, window, halo=halo, nodata=band.GetNoDataValue())[0])
+    result = np.asarray(func(*arrays, **func_kwargs))
+    if result.shape[-2:] != (window[3], window[2]):
+        result = crop_halo(result, window, halo)
+    return window, result
+
+
+def map_bounded(func, tasks, workers=1):
+    """Maps a function to tasks in a process pool with a limited number of pending tasks, which keeps the memory
+    usage bounded. Results are yielded in the order of completion.
+
+    Args:
+        func (callable): A module-level (picklable) function that takes one task as argument.
+        tasks (iterable): Task arguments (may be a generator).
+        workers (int): Number of worker processes (default: ``1`` runs in the calling process; ``None`` uses all CPU cores).
+
+    Yields:
+        The results of ``func``.
+    """
+    workers = workers or os.cpu_count()
+    if workers <= 1:
+        for task in tasks:
+            yield func(task)
+        return
+    tasks = iter(tasks)
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = set(executor.submit(func, task) for task in itertools.islice(tasks, 2 * workers))
+        while pending:
+            done, pending = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                task = next(tasks, None)
+                if task is not None:
+                    pending.add(executor.submit(func, task))
+                yield future.result()
+
+
+def raster_stats(file_name, bands=1, approx=False, histogram_bins=None, workers=1):
+    """Computes the minimum, maximum, mean, standard deviation, and (optionally) a histogram of raster bands
+    block by block and stores the results in the PAM (``.aux.xml``) sidecar file of the raster. Later calls return
+    the stored results without reading any pixel unless the raster file was modified.
+
+    Args:
+        file_name (str): Target file name, including directory; must end on ``".tif"``.
+        bands (``int``, ``list``, or ``str``): Band number, list of band numbers, or ``"all"`` (default: ``1``).
+        approx (bool): Allow approximate statistics computed by gdal from overviews or a subset of blocks (default: ``False``).
+        histogram_bins (int): Number of histogram bins between the band minimum and maximum (default: ``None`` computes no histogram).
+        workers (int): Number of worker processes for computing the statistics of blocks (default: ``1``).
+
+    Returns:
+        dict: ``{BAND-NUMBER: {"min": float, "max": float, "mean": float, "std": float, "count": int, "histogram": list}}``,
+        where ``"count"`` is the number of valid pixels (``None`` for approximate statistics) and ``"histogram"`` is
+        ``None`` if ``histogram_bins`` is ``None``.
+
+    Hint:
+        The block statistics are merged with the parallel variant of Welford's algorithm (see ``merge_moments``).
+        Histograms require a second pass over the blocks unless the band minimum and maximum are already known.
+    """
+    raster, band = open_raster(file_name)
+    try:
+        band_numbers = [bands] if isinstance(bands, int) else read_band_numbers(raster, bands)
+        cols, rows = raster.RasterXSize, raster.RasterYSize
+    except AttributeError:
+        logging.error("Could not open %s." % str(file_name))
+        return None
+    signature = str(DatasetCache.get_signature(file_name))
+
+    band_stats = {}
+    for band_number in band_numbers:
+        band = raster.GetRasterBand(band_number)
+        stats = read_cached_stats(band, signature, approx=approx, histogram_bins=histogram_bins)
+        if stats:
+            band_stats[band_number] = stats
+            continue
+
+        if approx:
+            logging.info(" * computing approximate statistics of band %i ..." % band_number)
+            b_min, b_max, b_mean, b_std = band.ComputeStatistics(True)
+            stats = {"min": b_min, "max": b_max, "mean": b_mean, "std": b_std, "count": None, "histogram": None}
+        else:
+            logging.info(" * computing statistics of band %i ..." % band_number)
+            block_x, block_y = band.GetBlockSize()
+            tasks = ((file_name, band_number, window) for window in iter_windows(cols, rows, block_x, block_y))
+            count, mean, m2, b_min, b_max = 0, 0., 0., np.inf, -np.inf
+            for moments in map_bounded(block_moments, tasks, workers=workers):
+                count, mean, m2, b_min, b_max = merge_moments((count, mean, m2, b_min, b_max), moments)
+            if count == 0:
+                logging.error("Band %i of %s has no valid pixels." % (band_number, str(file_name)))
+                continue
+            stats = {"min": float(b_min), "max": float(b_max), "mean": float(mean),
+                     "std": float(np.sqrt(m2 / count)), "count": int(count), "histogram": None}
+
+        if histogram_bins:
+            if approx:
+                stats["histogram"] = list(band.GetHistogram(stats["min"], stats["max"], int(histogram_bins),
+                                                            include_out_of_range=1, approx_ok=1))
+            else:
+                block_x, block_y = band.GetBlockSize()
+                tasks = ((file_name, band_number, window, stats["min"], stats["max"], int(histogram_bins))
+                         for window in iter_windows(cols, rows, block_x, block_y))
+                histogram = np.zeros(int(histogram_bins), dtype=np.int64)
+                for block_counts in map_bounded(block_histogram, tasks, workers=workers):
+                    histogram += block_counts
+                stats["histogram"] = histogram.tolist()
+
+        # store statistics in the PAM (.aux.xml) sidecar file
+        band.SetStatistics(stats["min"], stats["max"], stats["mean"], stats["std"])
+        band.SetMetadataItem("STATISTICS_APPROXIMATE", "YES" if approx else "NO")
+        band.SetMetadataItem("STATISTICS_SOURCE_SIGNATURE", signature)
+        if stats["count"] is not None:
+            band.SetMetadataItem("STATISTICS_VALID_COUNT", str(stats["count"]))
+        if stats["histogram"] is not None:
+            band.SetDefaultHistogram(stats["min"], stats["max"], stats["histogram"])
+        band_stats[band_number] = stats
+    raster.FlushCache()
+    return band_stats
+
+
+def read_cached_stats(band, signature, approx=False, histogram_bins=None):
+    """Reads statistics that ``raster_stats`` stored in the metadata of a raster band. This function is called by ``raster_stats``.
+
+    Args:
+        band (osgeo.gdal.Band): The raster band.
+        signature (str): Modification signature of the raster file (see ``DatasetCache.get_signature``).
+        approx (bool): Accept approximate statistics (default: ``False``).
+        histogram_bins (int): Required number of histogram bins (default: ``None``).
+
+    Returns:
+        dict: Statistics (see ``raster_stats``) or ``None`` if no valid statistics are stored.
+    """
+    if band.GetMetadataItem("STATISTICS_SOURCE_SIGNATURE") != signature or band.GetMetadataItem("STATISTICS_MEAN") is None:
+        return None
+    if not approx and band.GetMetadataItem("STATISTICS_APPROXIMATE") == "YES":
+        return None
+    count = band.GetMetadataItem("STATISTICS_VALID_COUNT")
+    stats = {"min": float(band.GetMetadataItem("STATISTICS_MINIMUM")),
+             "max": float(band.GetMetadataItem("STATISTICS_MAXIMUM")),
+             "mean": float(band.GetMetadataItem("STATISTICS_MEAN")),
+             "std": float(band.GetMetadataItem("STATISTICS_STDDEV")),
+             "count": None if count is None else int(count),
+             "histogram": None}
+    if histogram_bins:
+        histogram = band.GetDefaultHistogram(force=False)
+        if not histogram or histogram[2] != int(histogram_bins):
+            return None
+        stats["histogram"] = list(histogram[3])
+    return stats
+
+
+def block_moments(task):
+    """Computes the number, mean, sum of squared deviations, minimum, and maximum of the valid pixels of a raster block.
+    This function is called by ``raster_stats`` (in worker processes).
+
+    Args:
+        task (tuple): ``(file_name, band_number, window)``.
+
+    Returns:
+        tuple: ``(count, mean, m2, min, max)``
+    """
+    file_name, band_number, window = task
+    raster, band = open_raster(file_name, band_number=band_number)
+    array = read_raster_window(band, window, nodata=band.GetNoDataValue())[0]
+    values = array[np.isfinite(array)].astype(np.float64)
+    if values.size == 0:
+        return 0, 0., 0., np.inf, -np.inf
+    mean = values.mean()
+    return values.size, mean, float(((values - mean) ** 2).sum()), values.min(), values.max()
+
+
+def block_histogram(task):
+    """Counts the valid pixels of a raster block in histogram bins. This function is called by ``raster_stats`` (in worker processes).
+
+    Args:
+        task (tuple): ``(file_name, band_number, window, min, max, bins)``.
+
+    Returns:
+        ndarray: Pixel counts per bin.
+    """
+    file_name, band_number, window, b_min, b_max, bins = task
+    raster, band = open_raster(file_name, band_number=band_number)
+    array = read_raster_window(band, window, nodata=band.GetNoDataValue())[0]
+    return np.histogram(array[np.isfinite(array)], bins=bins, range=(b_min, b_max))[0]
+
+
+def merge_moments(moments_a, moments_b):
+    """Merges the moments of two sets of values with the parallel variant of Welford's algorithm (Chan et al.).
+    The moments can also be arrays, which merges many pairs of sets (e.g., zones) element-wise.
+
+    Args:
+        moments_a (tuple): ``(count, mean, m2, min, max)`` of the first set, where ``m2`` is the sum of squared deviations from the mean.
+        moments_b (tuple): ``(count, mean, m2, min, max)`` of the second set.
+
+    Returns:
+        tuple: ``(count, mean, m2, min, max)`` of the union of both sets.
+    """
+    count_a, mean_a, m2_a, min_a, max_a = moments_a
+    count_b, mean_b, m2_b, min_b, max_b = moments_b
+    count = count_a + count_b
+    if np.ndim(count) == 0 and count == 0:
+        return 0, 0., 0., np.inf, -np.inf
+    divisor = np.maximum(count, 1)
+    delta = mean_b - mean_a
+    mean = mean_a + delta * count_b / divisor
+    m2 = m2_a + m2_b + delta ** 2 * count_a * count_b / divisor
+    return count, mean, m2, np.minimum(min_a, min_b), np.maximum(max_a, max_b)
+
+
+def build_mosaic(files, out_vrt=None, resolution="average", srs=None, resampling="nearest"):
+    """Combines many (adjacent) rasters into one virtual mosaic (VRT) without copying pixels. All functions that
+    take a raster file name (e.g., ``raster2array``, ``iter_raster_blocks``, ``clip_raster``, or ``raster2polygon``)
+    accept the VRT and only read the tiles that a requested window intersects.
+
+    Args:
+        files (list): Raster file names, including directories.
+        out_vrt (str): Target VRT file name, including directory; must end on ``".vrt"`` (default: ``None`` creates an
+                       in-memory ``/vsimem/`` VRT, which can be removed with ``gdal.Unlink(out_vrt)``).
+        resolution (``str`` or ``float``): Either ``"highest"``, ``"lowest"``, ``"average"`` (default) resolution of
+                                           the input rasters, or a pixel size in the units of the spatial reference.
+        srs (``int`` or ``str``): Optional target EPSG code or WKT string to re-project the mosaic on the fly (default: ``None``).
+        resampling (str): Resampling method for resolution changes and re-projection (default: ``"nearest"``).
+
+    Returns:
+        str: The name of the VRT file (``None`` if the VRT could not be created).
+
+    Note:
+        With ``srs``, the re-projected (warped) VRT reads the pixels from an un-projected mosaic VRT, which is saved
+        as side file next to ``out_vrt`` and named ``NAME_mosaic.vrt`` (for ``out_vrt="NAME.vrt"``). Keep the side
+        file as long as ``out_vrt`` is used and delete both files together.
+    """
+    if not out_vrt:
+        out_vrt = "/vsimem/mosaic_%s.vrt" % os.urandom(8).hex()
+    vrt_options = {"resampleAlg": resampling}
+    if isinstance(resolution, str):
+        vrt_options["resolution"] = resolution
+    else:
+        vrt_options.update({"resolution": "user", "xRes": float(resolution), "yRes": float(resolution)})
+    release_dataset(out_vrt)
+    try:
+        if srs is None:
+            gdal.BuildVRT(out_vrt, list(files), **vrt_options)
+        else:
+            # the warped VRT references the mosaic VRT, which must therefore persist (side file)
+            mosaic_vrt = os.path.splitext(out_vrt)[0] + "_mosaic.vrt"
+            gdal.BuildVRT(mosaic_vrt, list(files), **vrt_options)
+            gdal.Warp(out_vrt, mosaic_vrt, format="VRT", resampleAlg=resampling,
+                      dstSRS="EPSG:%i" % srs if isinstance(srs, int) else srs)
+    except RuntimeError as e:
+        logging.error("Could not build the mosaic %s." % str(out_vrt))
+        logging.error(e)
+        return None
+    logging.info(" * successfully created %s" % out_vrt)
+    return out_vrt
 
 
 def remove_tif(file_name):
@@ -184,6 +1128,7 @@ def remove_tif(file_name):
     Returns:
         Removes the provided ``file_name`` and all dependencies.
     """
+    release_dataset(file_name)
     for file in glob.glob("%s*" % file_name.split(".tif")[0]):
         try:
             os.remove(file)
@@ -198,10 +1143,165 @@ def clip_raster(polygon, in_raster, out_raster):
     
     Args:
         polygon (str): A polygon shapefile name, including directory; must end on ``".shp"``.
-        in_raster (str): Name of the raster to be clipped, including its directory.
+        in_raster (str): Name of the raster (or VRT mosaic) to be clipped, including its directory.
         out_raster (str): Name of the target raster, including its directory.
         
     Returns: 
         None: Creates a new, clipped raster defined with ``out_raster``.
     """
+    release_dataset(out_raster)
+    if isinstance(in_raster, str):
+        in_raster = open_dataset(in_raster)
     gdal.Warp(out_raster, in_raster, cutlineDSName=polygon)
+
+
+def clip_raster_batch(polygon_shp, in_raster, out_dir=None, id_field=None, workers=1, output="file"):
+    """Clips a raster to every polygon of a shapefile. Every clip only reads the bounding-box window of the polygon
+    and applies the polygon (cutline) in memory. The polygons are distributed over a process pool, where every
+    worker process keeps one (cached) handle of ``in_raster``.
+
+    Args:
+        polygon_shp (str): A polygon shapefile name, including directory; must end on ``".shp"``.
+        in_raster (str): Name of the raster (or VRT mosaic) to be clipped, including its directory.
+        out_dir (str): Directory where the clipped rasters are saved as ``ID.tif`` (required with ``output="file"``).
+        id_field (str): Name of the shapefile field that identifies the polygons (default: ``None`` uses feature IDs).
+        workers (int): Number of worker processes (default: ``1``; ``None`` uses all CPU cores).
+        output (str): Use ``"file"`` (default) to write GeoTIFFs to ``out_dir``, or ``"array"`` to return arrays.
+
+    Returns:
+        dict: ``{ID: file_name}`` with ``output="file"``, or ``{ID: (array, geo_transform)}`` with ``output="array"``,
+        where ``array`` is a ``numpy.ma.MaskedArray`` (``(bands, rows, cols)`` for multi-band rasters) in the native
+        data type and pixels outside the polygon or with no-data values are masked. Polygons that do not overlap the
+        raster are omitted (``None`` if the shapefile cannot be opened, ``-1`` if ``output="file"`` but no ``out_dir``
+        is provided). Polygons are transformed to the spatial reference system of the raster (if both are defined).
+        Clipped GeoTIFFs without a no-data value in ``in_raster`` get ``nan_value`` (floats) or the maximum of the
+        integer data type as no-data value.
+    """
+    if output == "file" and not out_dir:
+        logging.error("clip_raster_batch requires an out_dir with output=\"file\".")
+        return -1
+    source_ds = open_dataset(polygon_shp, vector=True)
+    if not source_ds:
+        logging.error("Could not open %s." % str(polygon_shp))
+        return None
+    if output == "file":
+        os.makedirs(out_dir, exist_ok=True)
+
+    def iter_tasks():
+        layer = source_ds.GetLayer()
+        layer.ResetReading()
+        polygon_srs = layer.GetSpatialRef()
+        polygon_wkt = polygon_srs.ExportToWkt() if polygon_srs else None
+        for feature in layer:
+            if feature.GetGeometryRef() is None:
+                continue
+            feature_id = feature.GetField(id_field) if id_field else feature.GetFID()
+            out_file = os.path.join(out_dir, "%s.tif" % str(feature_id)) if output == "file" else None
+            yield in_raster, feature.GetGeometryRef().ExportToWkb(), polygon_wkt, feature_id, out_file
+
+    results = {}
+    for feature_id, result in map_bounded(clip_feature, iter_tasks(), workers=workers):
+        if result is not None:
+            results[feature_id] = result
+    return results
+
+
+def clip_feature(task):
+    """Clips a raster to one polygon geometry. This function is called by ``clip_raster_batch`` (in worker processes).
+
+    Args:
+        task (tuple): ``(in_raster, polygon_wkb, polygon_wkt, feature_id, out_file)``, where ``polygon_wkt`` is the
+            spatial reference system of the polygon (``None`` if undefined) and ``out_file=None`` returns arrays.
+
+    Returns:
+        tuple: The ``feature_id`` and either ``out_file``, or ``(masked_array, geo_transform)`` if ``out_file`` is ``None``
+        (``None`` if the polygon does not overlap the raster).
+    """
+    in_raster, polygon_wkb, polygon_wkt, feature_id, out_file = task
+    raster, band = open_raster(in_raster)
+    geometry = ogr.CreateGeometryFromWkb(polygon_wkb)
+    if polygon_wkt and raster.GetProjection():
+        # transform the polygon to the raster SRS (x/y order, like the geo transform)
+        polygon_srs = osr.SpatialReference(wkt=polygon_wkt)
+        raster_srs = osr.SpatialReference(wkt=raster.GetProjection())
+        if not polygon_srs.IsSame(raster_srs):
+            for srs in (polygon_srs, raster_srs):
+                srs.SetAxisMappingStrategy(osr.OAMS_TRADITIONAL_GIS_ORDER)
+            geometry.Transform(osr.CoordinateTransformation(polygon_srs, raster_srs))
+    window = get_pixel_window(raster.GetGeoTransform(), geometry.GetEnvelope(), raster.RasterXSize, raster.RasterYSize)
+    if not window:
+        return feature_id, None
+    window_geo_transform = get_window_geo_transform(raster.GetGeoTransform(), window[0], window[1])
+
+    # burn the polygon into an in-memory mask of the window (pixel centers inside the polygon, like gdal.Warp)
+    mask_ds = gdal.GetDriverByName("MEM").Create("", window[2], window[3], 1, gdal.GDT_Byte)
+    mask_ds.SetGeoTransform(window_geo_transform)
+    polygon_ds = ogr.GetDriverByName("Memory").CreateDataSource("")
+    polygon_lyr = polygon_ds.CreateLayer("polygon", geom_type=ogr.wkbMultiPolygon)
+    polygon_feature = ogr.Feature(polygon_lyr.GetLayerDefn())
+    polygon_feature.SetGeometry(geometry)
+    polygon_lyr.CreateFeature(polygon_feature)
+    gdal.RasterizeLayer(mask_ds, [1], polygon_lyr, burn_values=[1])
+    outside = mask_ds.ReadAsArray() == 0
+
+    array = raster.ReadAsArray(*window)
+    band_nodata = [raster.GetRasterBand(b + 1).GetNoDataValue() for b in range(raster.RasterCount)]
+    masked_array = mask_nodata(array, band_nodata if array.ndim == 3 else band_nodata[0])
+    masked_array.mask = np.ma.getmaskarray(masked_array) | outside
+
+    if out_file is None:
+        return feature_id, (masked_array, window_geo_transform)
+
+    release_dataset(out_file)
+    clip_ds = gdal.GetDriverByName("GTiff").Create(out_file, window[2], window[3], raster.RasterCount,
+                                                     eType=band.DataType, options=["COMPRESS=DEFLATE"])
+    clip_ds.SetGeoTransform(window_geo_transform)
+    clip_ds.SetProjection(raster.GetProjection())
+    for b in range(raster.RasterCount):
+        nodata = band_nodata[b] if band_nodata[b] is not None else get_default_nodata(array.dtype)
+        clip_band = clip_ds.GetRasterBand(b + 1)
+        clip_band.SetNoDataValue(nodata)
+        band_array = masked_array[b] if array.ndim == 3 else masked_array
+        clip_band.WriteArray(band_array.filled(nodata))
+    clip_ds.FlushCache()
+    return feature_id, out_file
+
+
+def get_default_nodata(dtype):
+    """Gets a no-data value that fits into a numpy data type: ``nan_value`` for floats and the maximum value of
+    integer data types (e.g., ``255`` for ``uint8``).
+
+    Args:
+        dtype (numpy.dtype): The data type of the raster array.
+
+    Returns:
+        float or int: The no-data value.
+    """
+    if np.issubdtype(dtype, np.integer):
+        return int(np.iinfo(dtype).max)
+    return nan_value
+
+
+def get_pixel_window(geo_transform, envelope, cols, rows):
+    """Gets the pixel window of a raster that covers a bounding box (envelope).
+
+    Args:
+        geo_transform (tuple): A ``osgeo.gdal.Dataset.GetGeoTransform`` object.
+        envelope (tuple): Bounding box ``(x_min, x_max, y_min, y_max)`` as returned by ``ogr.Geometry.GetEnvelope``.
+        cols (int): Number of raster columns.
+        rows (int): Number of raster rows.
+
+    Returns:
+        tuple: Window ``(x_off, y_off, x_size, y_size)`` in pixels, cropped to the raster extent (``None`` if the
+        envelope does not overlap the raster).
+    """
+    inv_geo_transform = gdal.InvGeoTransform(geo_transform)
+    corners = [gdal.ApplyGeoTransform(inv_geo_transform, x, y)
+               for x in envelope[0:2] for y in envelope[2:4]]
+    x_off = max(int(np.floor(min(corner[0] for corner in corners))), 0)
+    y_off = max(int(np.floor(min(corner[1] for corner in corners))), 0)
+    x_end = min(int(np.ceil(max(corner[0] for corner in corners))), cols)
+    y_end = min(int(np.ceil(max(corner[1] for corner in corners))), rows)
+    if x_end <= x_off or y_end <= y_off:
+        return None
+    return x_off, y_off, x_end - x_off, y_end - y_off
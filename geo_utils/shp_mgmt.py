@@ -47,6 +47,48 @@ def create_shp(shp_file_dir, overwrite=True, *args, **kwargs):
     return new_shp
 
 
+def create_vector_dataset(file_name, overwrite=True, layer_name=None, layer_type=None, srs=None):
+    """Creates a new vector dataset with one layer, where the driver is defined by the file ending: ``".shp"``
+    (ESRI Shapefile, see ``create_shp``), ``".gpkg"`` (GeoPackage), ``".fgb"`` (FlatGeobuf), or ``".geojson"``.
+    GeoPackage and FlatGeobuf layers are created with a spatial index.
+
+    Args:
+        file_name (str): The (relative) dataset directory and name.
+        overwrite (bool): If ``True`` (default), existing files are overwritten.
+        layer_name (str): The layer name to be created.
+        layer_type (str): Either ``"point"``, ``"line"``, or ``"polygon"`` of the ``layer_name``.
+        srs (osr.SpatialReference): Spatial reference of the layer (ignored for shapefiles, which use ``make_prj``).
+
+    Returns:
+        osgeo.ogr.DataSource: An ``ogr`` dataset (``None`` if the file exists and ``overwrite=False``).
+    """
+    extension = os.path.splitext(str(file_name))[-1].lower()
+    driver_dict = {".gpkg": ("GPKG", ["SPATIAL_INDEX=YES"]),
+                   ".fgb": ("FlatGeobuf", ["SPATIAL_INDEX=YES"]),
+                   ".geojson": ("GeoJSON", [])}
+    if extension not in driver_dict:
+        return create_shp(file_name, overwrite=overwrite, layer_name=layer_name, layer_type=layer_type)
+
+    driver = ogr.GetDriverByName(driver_dict[extension][0])
+    if os.path.exists(file_name):
+        if overwrite:
+            driver.DeleteDataSource(file_name)
+        else:
+            logging.error("%s already exists and overwrite=False." % str(file_name))
+            return None
+    new_dataset = driver.CreateDataSource(file_name)
+    geometry_dict = {"point": ogr.wkbPoint,
+                     "points": ogr.wkbMultiPoint,
+                     "line": ogr.wkbMultiLineString,
+                     "polygon": ogr.wkbMultiPolygon}
+    try:
+        new_dataset.CreateLayer(str(layer_name), srs=srs, geom_type=geometry_dict[str(layer_type).lower()],
+                                options=driver_dict[extension][1])
+    except KeyError:
+        logging.error("Invalid layer_type provided (must be 'point', 'line', or 'polygon').")
+    return new_dataset
+
+
 def get_geom_description(layer):
     """Gets the WKB Geometry Type as string from a shapefile layer.
     
@@ -1,8 +1,19 @@
 from .dataset_mgmt import *
+import threading
+
+
+default_wkt = 'GEOGCS["GCS_WGS_1984",DATUM["D_WGS_1984",SPHEROID["WGS_1984",6378137,298.257223563]],PRIMEM["Greenwich",0],UNIT["Degree",0.017453292519943295],UNIT["Meter",1]]'
+wkt_cache_dir = os.environ.get("GEO_UTILS_WKT_CACHE")
+srs_cache = {}
+srs_cache_info = {"hits": 0, "misses": 0}
+srs_cache_lock = threading.Lock()
+max_srs_cache_size = 1024
+coord_transformations = {}
+coord_transformations_lock = threading.Lock()
 
 
 def get_esriwkt(epsg):
-    """Gets esriwkt-formatted spatial references with epsg code online.
+    """Gets esriwkt-formatted spatial references with epsg code (resolved offline with ``osr``, see ``get_wkt``).
 
     Args:
         epsg (int): EPSG Authority Code
@@ -13,26 +24,12 @@ def get_esriwkt(epsg):
     Example:
         ``get_esriwkt(4326)``
     """
-    try:
-        with urllib.request.urlopen("http://spatialreference.org/ref/epsg/{0}/esriwkt/".format(epsg)) as response:
-            return str(response.read()).strip("b").strip("'")
-    except Exception:
-        pass
-    try:
-        with urllib.request.urlopen(
-                "http://spatialreference.org/ref/sr-org/epsg{0}-wgs84-web-mercator-auxiliary-sphere/esriwkt/".format(
-                    epsg)) as response:
-            return str(response.read()).strip("b").strip("'")
-        # sr-org codes are available at "https://spatialreference.org/ref/sr-org/{0}/esriwkt/".format(epsg)
-        # for example EPSG:3857 = SR-ORG:6864 -> https://spatialreference.org/ref/sr-org/6864/esriwkt/ = EPSG:3857
-    except Exception as e:
-        logging.error("Could not find epsg code on spatialreference.org. Returning default WKT(epsg=4326).")
-        print(e)
-        return 'GEOGCS["GCS_WGS_1984",DATUM["D_WGS_1984",SPHEROID["WGS_1984",6378137,298.257223563]],PRIMEM["Greenwich",0],UNIT["Degree",0.017453292519943295],UNIT["Meter",1]]'
+    return get_wkt(epsg, wkt_format="esriwkt", pretty=False)
 
 
 def get_srs(dataset):
-    """Gets the spatial reference of any ``gdal.Dataset``.
+    """Gets the spatial reference of any ``gdal.Dataset``. The EPSG identification is memoized by a hash of the
+    normalized WKT of the dataset, and every call returns a clone of the cached spatial reference.
 
     Args:
         dataset (gdal.Dataset): A shapefile or raster.
@@ -43,22 +40,93 @@ def get_srs(dataset):
     gdal.UseExceptions()
 
     if verify_dataset(dataset) == "raster":
-        sr = osr.SpatialReference()
-        sr.ImportFromWkt(dataset.GetProjection())
+        wkt = dataset.GetProjection()
     else:
         try:
-            sr = osr.SpatialReference(str(dataset.GetLayer().GetSpatialRef()))
+            wkt = str(dataset.GetLayer().GetSpatialRef())
         except AttributeError:
             logging.error("Invalid source data (%s)." % str(dataset))
             return None
+
+    sr = get_cached_srs(wkt)
+    if sr is None:
+        logging.error("Empty spatial reference.")
+        return None
+    return sr.Clone()
+
+
+def get_cached_srs(wkt):
+    """Gets the identified spatial reference of a WKT string from the cache of ``get_srs``, which is keyed by a hash
+    of the normalized WKT. The returned object is shared and must not be modified (``get_srs`` returns clones). The
+    cache is thread-safe and cleared when it holds ``max_srs_cache_size`` spatial references.
+
+    Args:
+        wkt (str): WKT-formatted spatial reference.
+
+    Returns:
+        osr.SpatialReference: The cached spatial reference object (``None`` if the WKT is empty or invalid).
+    """
+    key = hashlib.sha1(" ".join(wkt.split()).encode("utf-8")).hexdigest()
+    with srs_cache_lock:
+        try:
+            sr = srs_cache[key]
+            srs_cache_info["hits"] += 1
+            return sr
+        except KeyError:
+            srs_cache_info["misses"] += 1
+    # identify outside of the lock (concurrent misses of the same WKT identify it twice)
+    sr = identify_srs(wkt)
+    with srs_cache_lock:
+        if len(srs_cache) >= max_srs_cache_size:
+            srs_cache.clear()
+        srs_cache[key] = sr
+    return sr
+
+
+def identify_epsg(wkt):
+    """Identifies the EPSG authority code of a WKT-formatted spatial reference (memoized with ``get_srs``'s cache;
+    called by ``dataset_mgmt.describe``).
+
+    Args:
+        wkt (str): WKT-formatted spatial reference.
+
+    Returns:
+        int: The EPSG authority code (``None`` if it could not be identified).
+    """
+    if not wkt:
+        return None
+    sr = get_cached_srs(wkt)
+    try:
+        return int(sr.GetAuthorityCode(None))
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+
+def identify_srs(wkt):
+    """Identifies the EPSG authority code of a WKT-formatted spatial reference (called by ``get_srs`` on cache misses).
+
+    Args:
+        wkt (str): WKT-formatted spatial reference.
+
+    Returns:
+        osr.SpatialReference: A spatial reference object (``None`` if the WKT is empty).
+    """
+    sr = osr.SpatialReference()
+    try:
+        sr.ImportFromWkt(wkt)
+    except RuntimeError:
+        return None
     # auto-detect epsg
     try:
-        auto_detect = sr.AutoIdentifyEPSG()
+        try:
+            auto_detect = sr.AutoIdentifyEPSG()
+        except RuntimeError:
+            # raised instead of a non-zero return code with gdal.UseExceptions()
+            auto_detect = 1
         if auto_detect != 0:
             sr = sr.FindMatches()[0][0]  # Find matches returns list of tuple of SpatialReferences
             sr.AutoIdentifyEPSG()
-    except TypeError:
-        logging.error("Empty spatial reference.")
+    except (IndexError, RuntimeError, TypeError):
         return None
     # assign input SpatialReference
     try:
@@ -68,29 +136,105 @@ def get_srs(dataset):
     return sr
 
 
-def get_wkt(epsg, wkt_format="esriwkt"):
-    """Gets WKT-formatted projection information for an epsg code using the ``osr`` library.
+def get_srs_cache_info():
+    """Gets the hit and miss counters of the ``get_srs`` cache.
+
+    Returns:
+        dict: ``{"hits": int, "misses": int, "size": int}``
+    """
+    with srs_cache_lock:
+        return dict(srs_cache_info, size=len(srs_cache))
+
+
+def clear_srs_cache():
+    """Clears the ``get_srs`` cache and resets its counters."""
+    with srs_cache_lock:
+        srs_cache.clear()
+        srs_cache_info.update(hits=0, misses=0)
+
+
+def get_wkt(epsg, wkt_format="esriwkt", pretty=True):
+    """Gets WKT-formatted projection information for an epsg code using the ``osr`` library. The results are memoized
+    in the process (see ``lookup_wkt``) and optionally in a directory shared by processes (see ``set_wkt_cache_dir``).
 
     Args:
         epsg (int): epsg Authority code
         wkt_format (str): of wkt format (default is esriwkt for shapefile projections)
-      
+        pretty (bool): Return multi-line (pretty) WKT (default: ``True``).
+
     Returns:
         str: WKT (if error: returns default corresponding to ``epsg=4326``).
     """
-    default = 'GEOGCS["GCS_WGS_1984",DATUM["D_WGS_1984",SPHEROID["WGS_1984",6378137,298.257223563]],PRIMEM["Greenwich",0],UNIT["Degree",0.017453292519943295],UNIT["Meter",1]]'
-    spatial_ref = osr.SpatialReference()
     try:
-        spatial_ref.ImportFromEPSG(epsg)
+        return lookup_wkt(epsg, wkt_format=wkt_format, pretty=pretty)
     except TypeError:
         logging.error("epsg must be integer. Returning default WKT(epsg=4326).")
-        return default
+        return default_wkt
     except Exception:
         logging.error("epsg number does not exist. Returning default WKT(epsg=4326).")
-        return default
+        return default_wkt
+
+
+@functools.lru_cache(maxsize=1024)
+def lookup_wkt(epsg, wkt_format="esriwkt", pretty=True):
+    """Resolves the WKT of an epsg code with ``osr`` (or reads it from the on-disk cache). The function is
+    memoized with an LRU cache and raises errors of invalid epsg codes (use ``get_wkt`` instead), which are neither
+    memoized nor written to the on-disk cache.
+
+    Args:
+        epsg (int): epsg Authority code
+        wkt_format (str): of wkt format (``"esriwkt"`` applies ``MorphToESRI``)
+        pretty (bool): Return multi-line (pretty) WKT (default: ``True``).
+
+    Returns:
+        str: WKT
+
+    Raises:
+        ValueError: If ``osr`` cannot import the epsg code or returns an empty WKT.
+    """
+    cache_file = None
+    if wkt_cache_dir:
+        cache_file = os.path.join(wkt_cache_dir, "epsg%i_%s%s.wkt" % (epsg, wkt_format, "_pretty" if pretty else ""))
+        try:
+            with open(cache_file) as f:
+                wkt = f.read()
+            if wkt:
+                return wkt
+        except OSError:
+            pass
+
+    spatial_ref = osr.SpatialReference()
+    if spatial_ref.ImportFromEPSG(epsg) != 0:
+        raise ValueError("osr could not import epsg=%s." % str(epsg))
     if wkt_format == "esriwkt":
         spatial_ref.MorphToESRI()
-    return spatial_ref.ExportToPrettyWkt()
+    wkt = spatial_ref.ExportToPrettyWkt() if pretty else spatial_ref.ExportToWkt()
+    if not wkt:
+        raise ValueError("osr returned an empty WKT for epsg=%s." % str(epsg))
+
+    if cache_file:
+        # write to a temporary file first, such that other processes never read incomplete files
+        try:
+            os.makedirs(wkt_cache_dir, exist_ok=True)
+            file_handle, temp_file = tempfile.mkstemp(dir=wkt_cache_dir, suffix=".tmp")
+            with os.fdopen(file_handle, "w") as f:
+                f.write(wkt)
+            os.replace(temp_file, cache_file)
+        except OSError as e:
+            logging.warning("Could not write WKT cache file %s (%s)." % (cache_file, str(e)))
+    return wkt
+
+
+def set_wkt_cache_dir(directory):
+    """Sets the directory of the on-disk WKT cache, which is shared by processes (default: the environment variable
+    ``GEO_UTILS_WKT_CACHE`` or ``None`` for no on-disk cache).
+
+    Args:
+        directory (str): Cache directory (``None`` disables the on-disk cache).
+    """
+    global wkt_cache_dir
+    wkt_cache_dir = directory
+    lookup_wkt.cache_clear()
 
 
 def make_prj(shp_file_name, epsg):
@@ -103,19 +247,102 @@ def make_prj(shp_file_name, epsg):
     Returns:
         Creates a projection file (``.prj``) in the same directory and with the same name of ``shp_file_name``.
     """
-    shp_dir = shp_file_name.strip(shp_file_name.split("/")[-1].split("\\")[-1])
-    shp_name = shp_file_name.split(".shp")[0].split("/")[-1].split("\\")[-1]
-    with open(r"" + shp_dir + shp_name + ".prj", "w+") as prj:
+    with open(os.path.splitext(shp_file_name)[0] + ".prj", "w+") as prj:
         prj.write(get_wkt(epsg))
 
 
-def reproject(source_dataset, new_projection_dataset):
+def get_coordinate_transformation(source, target, traditional_axis_order=True):
+    """Gets a cached ``osr.CoordinateTransformation``. Transformations are cached per source and target spatial
+    reference, axis order, and thread (``osr`` transformations must not be shared between threads).
+
+    Args:
+        source (``int`` or ``osr.SpatialReference``): Source EPSG authority code or spatial reference.
+        target (``int`` or ``osr.SpatialReference``): Target EPSG authority code or spatial reference.
+        traditional_axis_order (bool): Use the (x, y) = (easting, northing) or (longitude, latitude) axis order
+                                       independent of the axis order that the EPSG defines (default: ``True``).
+
+    Returns:
+        osr.CoordinateTransformation: The (cached) transformation.
+    """
+    key = (get_srs_key(source), get_srs_key(target), bool(traditional_axis_order), threading.get_ident())
+    with coord_transformations_lock:
+        try:
+            return coord_transformations[key]
+        except KeyError:
+            pass
+    spatial_refs = []
+    for srs in (source, target):
+        if isinstance(srs, osr.SpatialReference):
+            # clone to leave the axis order of the provided spatial reference unchanged
+            srs = srs.Clone()
+        else:
+            epsg = int(srs)
+            srs = osr.SpatialReference()
+            srs.ImportFromEPSG(epsg)
+        if traditional_axis_order:
+            srs.SetAxisMappingStrategy(osr.OAMS_TRADITIONAL_GIS_ORDER)
+        spatial_refs.append(srs)
+    coord_trans = osr.CoordinateTransformation(*spatial_refs)
+    with coord_transformations_lock:
+        if len(coord_transformations) >= 256:
+            coord_transformations.clear()
+        coord_transformations[key] = coord_trans
+    return coord_trans
+
+
+def get_srs_key(srs):
+    """Gets a hashable key of an EPSG authority code or a spatial reference (called by ``get_coordinate_transformation``).
+    Keys of spatial references include their data axis to SRS axis mapping, which clones (and transformations) keep."""
+    if isinstance(srs, osr.SpatialReference):
+        return srs.ExportToWkt(), tuple(srs.GetDataAxisToSRSAxisMapping())
+    return int(srs)
+
+
+def transform_coords(xs, ys, source, target, zs=None, traditional_axis_order=True, chunk_size=1000000):
+    """Transforms arrays of coordinates between spatial reference systems with one ``TransformPoints`` call per chunk
+    of points (i.e., without Python calls per point).
+
+    Args:
+        xs (ndarray): x-coordinates (any shape or a number).
+        ys (ndarray): y-coordinates (same shape as ``xs``).
+        source (``int`` or ``osr.SpatialReference``): Source EPSG authority code or spatial reference.
+        target (``int`` or ``osr.SpatialReference``): Target EPSG authority code or spatial reference.
+        zs (ndarray): Optional z-coordinates (same shape as ``xs``).
+        traditional_axis_order (bool): Use the (x, y) = (easting, northing) or (longitude, latitude) axis order
+                                       (default: ``True``).
+        chunk_size (int): Maximum number of points per ``TransformPoints`` call (default: ``1000000``).
+
+    Returns:
+        tuple: Transformed ``(xs, ys)`` arrays with the shape of ``xs`` (or ``(xs, ys, zs)`` if ``zs`` is provided).
+
+    Example:
+        ``x, y = transform_coords([9.18], [48.78], 4326, 3857)``
+    """
+    xs = np.asarray(xs, dtype=np.float64)
+    shape = xs.shape
+    points = np.column_stack((xs.ravel(), np.asarray(ys, dtype=np.float64).ravel(),
+                              np.zeros(xs.size) if zs is None else np.asarray(zs, dtype=np.float64).ravel()))
+    coord_trans = get_coordinate_transformation(source, target, traditional_axis_order=traditional_axis_order)
+    transformed = np.empty_like(points)
+    for start in range(0, points.shape[0], int(chunk_size)):
+        chunk = points[start:start + int(chunk_size)]
+        transformed[start:start + chunk.shape[0]] = np.array(coord_trans.TransformPoints(chunk.tolist()),
+                                                             dtype=np.float64).reshape((-1, 3))
+    coords = [transformed[:, 0].reshape(shape), transformed[:, 1].reshape(shape)]
+    if zs is not None:
+        coords.append(transformed[:, 2].reshape(shape))
+    return tuple(coords)
+
+
+def reproject(source_dataset, new_projection_dataset, cog=False, overviews=None):
     """Re-projects a dataset (raster or shapefile) onto the spatial reference system
     of a (shapefile or raster) layer.
 
     Args:
         source_dataset (gdal.Dataset): Shapefile or raster.
         new_projection_dataset (gdal.Dataset): Shapefile or raster with new projection info.
+        cog (bool): Write re-projected rasters as Cloud-Optimized GeoTIFF (default: ``False``).
+        overviews (list): Overview levels of re-projected rasters, for example, ``[2, 4, 8, 16]`` (default: ``None``).
         
     Returns:
         * If the source is a raster, the function creates a GeoTIFF in same directory as ``source_dataset`` with a ``"_reprojected"`` suffix in the file name.
@@ -130,19 +357,21 @@ def reproject(source_dataset, new_projection_dataset):
     layer_dict = get_layer(source_dataset)
 
     if layer_dict["type"] == "raster":
-        reproject_raster(source_dataset, srs_src, srs_tar)
+        reproject_raster(source_dataset, srs_src, srs_tar, cog=cog, overviews=overviews)
 
     if layer_dict["type"] == "vector":
         reproject_shapefile(source_dataset, layer_dict["layer"], srs_src, srs_tar)
 
 
-def reproject_raster(source_dataset, source_srs, target_srs):
+def reproject_raster(source_dataset, source_srs, target_srs, cog=False, overviews=None):
     """Re-projects a raster dataset. This function is called by the ``reproject`` function.
 
     Args:
         source_dataset (osgeo.ogr.DataSource): Instantiates with an ``ogr.Open(SHP-FILE)``.
         source_srs (osgeo.osr.SpatialReference): Instantiates with ``get_srs(source_dataset)``
         target_srs (osgeo.osr.SpatialReference): Instantiates with ``get_srs(DATASET-WITH-TARGET-PROJECTION)``.
+        cog (bool): Write a Cloud-Optimized GeoTIFF (default: ``False``).
+        overviews (list): Overview levels as decimation factors, for example, ``[2, 4, 8, 16]`` (default: ``None``).
 
     Returns:
         Creates a new GeoTIFF raster in the same directory where ``source_dataset`` lives.
@@ -159,13 +388,11 @@ def reproject_raster(source_dataset, source_srs, target_srs):
     source_srs.SetAxisMappingStrategy(osr.OAMS_TRADITIONAL_GIS_ORDER)
     target_srs.SetAxisMappingStrategy(osr.OAMS_TRADITIONAL_GIS_ORDER)
 
-    # get CoordinateTransformation
-    coord_trans = osr.CoordinateTransformation(source_srs, target_srs)
-
-    # get boundaries of reprojected (new) dataset
-    (org_x, org_y, org_z) = coord_trans.TransformPoint(src_geo_transform[0], src_geo_transform[3])
-    (max_x, min_y, new_z) = coord_trans.TransformPoint(src_geo_transform[0] + src_geo_transform[1] * x_size,
-                                                       src_geo_transform[3] + src_geo_transform[5] * y_size, )
+    # get boundaries of reprojected (new) dataset with the cached CoordinateTransformation
+    (org_x, max_x), (org_y, min_y) = transform_coords(
+        [src_geo_transform[0], src_geo_transform[0] + src_geo_transform[1] * x_size],
+        [src_geo_transform[3], src_geo_transform[3] + src_geo_transform[5] * y_size],
+        source_srs, target_srs)
 
     # INSTANTIATE NEW (REPROJECTED) IN-MEMORY DATASET AS A FUNCTION OF THE RASTER SIZE
     mem_driver = gdal.GetDriverByName('MEM')
@@ -191,7 +418,7 @@ def reproject_raster(source_dataset, source_srs, target_srs):
     tar_file_name = src_file_name.split(".tif")[0] + "_epsg" + target_srs.GetAuthorityCode(None) + ".tif"
     create_raster(tar_file_name, raster_array=tar_dataset.ReadAsArray(),
                   epsg=int(target_srs.GetAuthorityCode(None)),
-                  geo_info=tar_dataset.GetGeoTransform())
+                  geo_info=tar_dataset.GetGeoTransform(), cog=cog, overviews=overviews)
     logging.info("Saved reprojected raster as %s" % tar_file_name)
 
 
@@ -207,8 +434,8 @@ def reproject_shapefile(source_dataset, source_layer, source_srs, target_srs):
     Returns:
         Creates a new shapefile in the same directory where ``source_dataset`` lives.
     """
-    # make GeoTransformation
-    coord_trans = osr.CoordinateTransformation(source_srs, target_srs)
+    # get the (cached) GeoTransformation
+    coord_trans = get_coordinate_transformation(source_srs, target_srs, traditional_axis_order=False)
 
     # make target shapefile
     tar_file_name = verify_shp_name(source_dataset.GetName(), shorten_to=4).split(".shp")[